@@ -12,11 +12,20 @@ The Ray Actor pattern solves the subprocess lifecycle problem by:
 """
 import ray
 import time
+import asyncio
 import os
 import json
 import logging
+import threading
+import functools
+import zlib
+from collections import ChainMap
 from pathlib import Path
-from typing import Optional, Dict, List
+from typing import AsyncIterator, Callable, Optional, Dict, List
+try:
+    import orjson  # Optional: faster JSON parsing
+except ImportError:
+    orjson = None
 from claude_agent_sdk import (
     ClaudeSDKClient,
     ClaudeAgentOptions,
@@ -28,44 +37,140 @@ from claude_agent_sdk import (
     SystemMessage,
     ResultMessage
 )
+from .config import get_container_image_config
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
 
-def get_container_image_config() -> dict:
+class SessionNotConnectedError(RuntimeError):
     """
-    Get container image configuration from environment.
+    Raised when a session is used without a live Claude SDK connection.
 
-    Returns:
-        {
-            "uri": "ghcr.io/user/image@sha256:...",  # Full URI with digest
-            "registry_path": "ghcr.io/user/image",     # Without digest
-            "digest": "sha256:...",                     # Just the digest
-            "use_container": bool                       # Whether to use containers
-        }
+    Besides a missing connect(), this is what a caller sees after the
+    session disconnected itself on idle timeout.
     """
-    image_uri = os.getenv("CONTAINER_IMAGE_URI", "")
 
-    # Container mode is enabled if image URI is configured
-    use_container = bool(image_uri)
+# Text marker Claude can emit to signal task completion (fallback for ResultMessage)
+COMPLETION_MARKER = "[TASK_COMPLETE]"
+
+# Tool payloads larger than this are moved to the Ray object store
+LARGE_PAYLOAD_BYTES = 64 * 1024
+PAYLOAD_PREVIEW_CHARS = 1024
+
+# Actor teardowns in flight at once in cleanup_actors()
+MAX_PENDING_CLEANUPS = 4
+
+# In-process cache of actor handles keyed by execution_id.
+# Avoids a GCS lookup (ray.get_actor) on every HITL resume.
+_actor_cache: Dict[str, ray.actor.ActorHandle] = {}
+_actor_cache_lock = threading.Lock()
+
+# Hard-lifetime watchdogs armed by create_actor(timeout_s=...), keyed by execution_id
+_actor_watchdogs: Dict[str, asyncio.TimerHandle] = {}
+# Strong references to running watchdog cleanups (the loop only keeps weak ones)
+_watchdog_tasks: set = set()
+
+# Settings files baked into the container image
+MASTER_SETTINGS_PATH = Path("/app/template_user/.claude/settings.json")
+PROJECT_SETTINGS_PATH = Path("/app/.claude/settings.json")
 
-    # Parse digest from URI if present (format: image@sha256:...)
-    registry_path = ""
-    digest = ""
-    if image_uri and "@" in image_uri:
-        registry_path, digest = image_uri.split("@", 1)
-    elif image_uri:
-        registry_path = image_uri
+# Plugins baked into the image by build.sh: {PLUGINS_ROOT}/{marketplace}/plugins/{plugin}/
+PLUGINS_ROOT = "/app/plugins"
+# Capabilities of the baked plugins, generated at image build time
+# (python -m claude_hitl_template.plugin_manifest)
+PLUGIN_MANIFEST_PATH = os.path.join(PLUGINS_ROOT, "manifest.json")
 
+# Parsed settings.json files keyed by path: (st_mtime_ns, data)
+_settings_cache: Dict[str, tuple] = {}
+
+# ClaudeAgentOptions shared by sessions hosted in the same worker process
+_options_cache: Dict[tuple, ClaudeAgentOptions] = {}
+
+
+@functools.lru_cache(maxsize=1)
+def _container_env_vars() -> Dict[str, str]:
+    """
+    Build the env_vars passed to containerized actors (once per process).
+
+    Returns:
+        Env var mapping for RuntimeEnv (shared; treat as read-only)
+    """
+    image_config = get_container_image_config()
     return {
-        "uri": image_uri,
-        "registry_path": registry_path,
-        "digest": digest,
-        "use_container": use_container
+        "ANTHROPIC_API_KEY": os.getenv("ANTHROPIC_API_KEY", ""),
+        "CONTAINER_IMAGE_URI": image_config["uri"],      # Pass to actor for logging
+        "CONTAINER_IMAGE_DIGEST": image_config["digest"], # Pass digest for validation
+        # HOME is set to /app/template_user in Dockerfile
+        # This makes "user" settings load from master config .claude/
     }
 
 
+def offload_large_payload(message: Dict, field: str) -> Dict:
+    """
+    Move an oversized message field into the Ray object store.
+
+    Tool payloads (file reads, command output, web fetches) can be several
+    megabytes. Instead of pickling them inline into every actor return value,
+    they are written once to Ray's shared-memory object store and referenced
+    via "{field}_ref". The inline field keeps a short preview for display;
+    consumers call ray.get() on the ref only when they need the full payload.
+
+    Only str/bytes payloads are offloaded: a truncated preview of a dict or
+    list would no longer match the message schema (e.g. tool_use "input"
+    is always a dict), so structured payloads stay inline.
+
+    Refs are owned by the actor, so they stay valid while the session lives.
+
+    Args:
+        message: Message dict to update in place
+        field: Name of the payload field ("content", "input", ...)
+
+    Returns:
+        The same message dict
+    """
+    value = message.get(field)
+
+    if isinstance(value, (str, bytes)) and len(value) > LARGE_PAYLOAD_BYTES:
+        message[f"{field}_ref"] = ray.put(value)
+        message[field] = value[:PAYLOAD_PREVIEW_CHARS]
+
+    return message
+
+
+def load_settings_file(path) -> Dict:
+    """
+    Read and parse a settings.json file, reusing the parsed result while unchanged.
+
+    The cache is keyed by path and invalidated when the file's mtime changes,
+    so actor init and get_metadata() share one parse per file.
+    Uses orjson when installed, stdlib json otherwise.
+    The returned dict is shared - callers must not mutate it.
+
+    Args:
+        path: Path to JSON settings file (str or Path)
+
+    Returns:
+        Parsed JSON content
+
+    Raises:
+        OSError: If the file can't be read
+        ValueError: If the file isn't valid JSON
+    """
+    key = os.fspath(path)
+    mtime = os.stat(key).st_mtime_ns
+    cached = _settings_cache.get(key)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    # Parse raw bytes directly (no intermediate str decode)
+    with open(key, "rb") as f:
+        raw = f.read()
+    data = orjson.loads(raw) if orjson else json.loads(raw)
+    _settings_cache[key] = (mtime, data)
+    return data
+
+
 def load_marketplace_settings() -> Dict:
     """
     Read and merge marketplace settings from master and project configs.
@@ -74,90 +179,353 @@ def load_marketplace_settings() -> Dict:
     Project config adds/overrides plugins (project-level).
 
     Returns:
-        Dict with 'marketplaces' and 'enabled_plugins' keys
+        Dict with 'marketplaces', 'enabled_plugins' and 'permissions' keys
     """
-    marketplaces = {}
-    enabled_plugins = {}
+    return _merge_marketplace_settings(
+        _load_or_error(MASTER_SETTINGS_PATH),
+        _load_or_error(PROJECT_SETTINGS_PATH)
+    )
 
-    # Read master config (user-level settings)
-    master_settings_path = Path("/app/template_user/.claude/settings.json")
-    if master_settings_path.exists():
-        try:
-            data = json.loads(master_settings_path.read_text())
-            marketplaces.update(data.get("extraKnownMarketplaces", {}))
-            enabled_plugins.update(data.get("enabledPlugins", {}))
-            logger.info(f"Loaded master settings: {len(enabled_plugins)} plugins declared")
-        except Exception as e:
-            logger.error(f"Failed to read master settings from {master_settings_path}: {e}")
+
+async def aload_marketplace_settings() -> Dict:
+    """
+    Async variant of load_marketplace_settings().
+
+    Reads the master and project settings files concurrently in worker
+    threads, so neither read blocks the event loop or waits on the other.
+
+    Returns:
+        Dict with 'marketplaces', 'enabled_plugins' and 'permissions' keys
+    """
+    master, project = await asyncio.gather(
+        asyncio.to_thread(load_settings_file, MASTER_SETTINGS_PATH),
+        asyncio.to_thread(load_settings_file, PROJECT_SETTINGS_PATH),
+        return_exceptions=True
+    )
+    return _merge_marketplace_settings(master, project)
+
+
+def _load_or_error(path: Path):
+    """Parse a settings file, returning the exception instead of raising it."""
+    try:
+        return load_settings_file(path)
+    except Exception as e:
+        return e
+
+
+def _merge_marketplace_settings(master, project) -> Dict:
+    """
+    Merge master and project settings (project overrides master).
+
+    marketplaces and enabled_plugins are ChainMap views over the parsed
+    (cached) settings rather than copies: lookups hit project first, then
+    master, exactly like dict.update() in that order. They are read-only;
+    writing to them would mutate the shared cached settings.
+
+    Args:
+        master: Parsed master settings, or the exception raised reading them
+        project: Parsed project settings, or the exception raised reading them
+
+    Returns:
+        Dict with 'marketplaces', 'enabled_plugins' and 'permissions' keys
+    """
+    layers = []  # Highest precedence first
+
+    # Project config (project-level settings, overrides master)
+    if isinstance(project, FileNotFoundError):
+        logger.info("Project settings not found at %s (optional)", PROJECT_SETTINGS_PATH)
+    elif isinstance(project, BaseException):
+        logger.error("Failed to read project settings from %s: %s", PROJECT_SETTINGS_PATH, project)
     else:
-        logger.warning(f"Master settings not found at {master_settings_path}")
+        layers.append(project)
 
-    # Read project config (project-level settings, overrides master)
-    project_settings_path = Path("/app/.claude/settings.json")
-    if project_settings_path.exists():
-        try:
-            data = json.loads(project_settings_path.read_text())
-            marketplaces.update(data.get("extraKnownMarketplaces", {}))
-            enabled_plugins.update(data.get("enabledPlugins", {}))
-            logger.info(f"Loaded project settings: {len(enabled_plugins)} total plugins after merge")
-        except Exception as e:
-            logger.error(f"Failed to read project settings from {project_settings_path}: {e}")
+    # Master config (user-level settings)
+    if isinstance(master, FileNotFoundError):
+        logger.warning("Master settings not found at %s", MASTER_SETTINGS_PATH)
+    elif isinstance(master, BaseException):
+        logger.error("Failed to read master settings from %s: %s", MASTER_SETTINGS_PATH, master)
     else:
-        logger.info(f"Project settings not found at {project_settings_path} (optional)")
+        logger.info("Loaded master settings: %s plugins declared", len(master.get("enabledPlugins", {})))
+        layers.append(master)
+
+    marketplaces = ChainMap(*(data.get("extraKnownMarketplaces", {}) for data in layers))
+    enabled_plugins = ChainMap(*(data.get("enabledPlugins", {}) for data in layers))
+    permissions = set()
+    for data in layers:
+        permissions.update(data.get("permissions", {}).get("allow", []))
+
+    if layers and layers[0] is project:
+        logger.info("Loaded project settings: %s total plugins after merge", len(enabled_plugins))
 
     return {
         "marketplaces": marketplaces,
-        "enabled_plugins": enabled_plugins
+        "enabled_plugins": enabled_plugins,
+        "permissions": sorted(permissions)  # Union of allowed tools
     }
 
 
-def resolve_plugin_paths(settings: Dict) -> List[Dict[str, str]]:
+def resolve_plugin_paths(settings: Dict) -> List[Dict]:
     """
-    Convert enabledPlugins to Agent SDK plugin specs.
+    Convert enabledPlugins to plugin infos with enumerated capabilities.
 
     Parses "plugin-name@marketplace-name" format and resolves to filesystem paths.
     Plugins must exist at /app/plugins/{marketplace}/plugins/{plugin}/
 
+    Capabilities (commands, agents, skills, MCP servers) come from the baked
+    plugin manifest when present, otherwise they are scanned once here, so
+    get_metadata() can report them without touching the filesystem again.
+
     Args:
         settings: Dict from load_marketplace_settings()
 
     Returns:
-        List of plugin specs for ClaudeAgentOptions
+        List of plugin infos with keys type, path, name, marketplace,
+        commands, agents, skills, mcp_servers. Use plugin_sdk_specs()
+        to derive the specs for ClaudeAgentOptions.
     """
-    plugin_specs = []
+    plugin_infos = []
+    manifest = load_plugin_manifest()
 
     for plugin_key, enabled in settings["enabled_plugins"].items():
         if not enabled:
-            logger.debug(f"Skipping disabled plugin: {plugin_key}")
+            logger.debug("Skipping disabled plugin: %s", plugin_key)
             continue
 
         # Parse "plugin-name@marketplace-name" format
         if "@" not in plugin_key:
-            logger.warning(f"Invalid plugin key format (missing @): {plugin_key}")
+            logger.warning("Invalid plugin key format (missing @): %s", plugin_key)
             continue
 
         plugin_name, marketplace_name = plugin_key.split("@", 1)
 
+        # Baked manifest entry: no filesystem access needed
+        if plugin_key in manifest:
+            plugin_infos.append(dict(manifest[plugin_key]))
+            logger.info("✓ Found plugin: %s@%s (manifest)", plugin_name, marketplace_name)
+            continue
+
         # Plugins are baked into /app/plugins/{marketplace}/plugins/{plugin}
         # This path structure matches how build.sh copies them
-        plugin_path = f"/app/plugins/{marketplace_name}/plugins/{plugin_name}"
-
-        if Path(plugin_path).exists():
-            plugin_specs.append({
-                "type": "local",
-                "path": plugin_path
-            })
-            logger.info(f"✓ Found plugin: {plugin_name}@{marketplace_name}")
+        plugin_path = f"{PLUGINS_ROOT}/{marketplace_name}/plugins/{plugin_name}"
+
+        if os.path.isdir(plugin_path):
+            plugin_infos.append(
+                _scan_plugin_capabilities(plugin_path, plugin_name, marketplace_name)
+            )
+            logger.info("✓ Found plugin: %s@%s", plugin_name, marketplace_name)
         else:
-            logger.warning(f"✗ Plugin path not found: {plugin_path} (declared but not baked into image)")
+            logger.warning("✗ Plugin path not found: %s (declared but not baked into image)", plugin_path)
 
-    return plugin_specs
+    return plugin_infos
 
 
-@ray.remote
-class ClaudeSessionActor:
+@functools.lru_cache(maxsize=1)
+def load_plugin_manifest() -> Dict[str, Dict]:
+    """
+    Load the plugin manifest generated at image build time (once per process).
+
+    Returns:
+        {"plugin@marketplace": plugin info} (see resolve_plugin_paths), or {}
+        if no manifest was baked into the image. Treat as read-only.
+    """
+    try:
+        return load_settings_file(PLUGIN_MANIFEST_PATH)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.warning("Failed to read plugin manifest from %s: %s", PLUGIN_MANIFEST_PATH, e)
+        return {}
+
+
+def plugin_sdk_specs(plugin_infos: List[Dict]) -> List[Dict[str, str]]:
+    """
+    Strip plugin infos down to the {"type", "path"} specs the Agent SDK expects.
+
+    Args:
+        plugin_infos: Plugin infos from resolve_plugin_paths()
+
+    Returns:
+        List of plugin specs for ClaudeAgentOptions
+    """
+    return [{"type": info["type"], "path": info["path"]} for info in plugin_infos]
+
+
+def _scan_plugin_capabilities(plugin_path: str, plugin_name: str, marketplace_name: str) -> Dict:
+    """
+    Enumerate a plugin's commands, agents, skills and MCP servers.
+
+    Args:
+        plugin_path: Plugin directory
+        plugin_name: Plugin name (from the enabledPlugins key)
+        marketplace_name: Marketplace name (from the enabledPlugins key)
+
+    Returns:
+        Plugin info dict (see resolve_plugin_paths)
+    """
+    # Plain string joins: no Path objects per plugin subdirectory
+    join = os.path.join
+
+    # Scan for commands/agents (*.md) and skills (subdirectories)
+    plugin_info = {
+        "type": "local",
+        "path": plugin_path,
+        "name": plugin_name,
+        "marketplace": marketplace_name,
+        "commands": _list_markdown_stems(join(plugin_path, "commands")),
+        "agents": _list_markdown_stems(join(plugin_path, "agents")),
+        "skills": _list_subdirectories(join(plugin_path, "skills")),
+        "mcp_servers": []
+    }
+
+    # Check for MCP servers in plugin settings.json
+    plugin_settings_path = join(plugin_path, "settings.json")
+    try:
+        plugin_settings = load_settings_file(plugin_settings_path)
+        plugin_info["mcp_servers"] = list(plugin_settings.get("mcp_servers", {}).keys())
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning("Failed to read plugin settings from %s: %s", plugin_settings_path, e)
+
+    return plugin_info
+
+
+def _list_markdown_stems(directory: str) -> List[str]:
     """
-    Persistent Ray Actor managing a single Claude SDK session.
+    List the stems of *.md files in a directory.
+
+    Uses a single os.scandir() pass: DirEntry caches the file type,
+    so no extra stat() per entry and no separate exists() check.
+
+    Returns:
+        File names without ".md" suffix ([] if directory doesn't exist)
+    """
+    try:
+        with os.scandir(directory) as entries:
+            return [
+                entry.name[:-3] for entry in entries
+                if entry.name.endswith(".md") and entry.is_file()
+            ]
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+
+def _list_subdirectories(directory: str) -> List[str]:
+    """
+    List non-hidden subdirectory names in a directory via one os.scandir() pass.
+
+    Returns:
+        Subdirectory names ([] if directory doesn't exist)
+    """
+    try:
+        with os.scandir(directory) as entries:
+            return [
+                entry.name for entry in entries
+                if not entry.name.startswith(".") and entry.is_dir()
+            ]
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+
+def get_agent_options(
+    cwd: str,
+    permission_mode: str,
+    setting_sources: Optional[List[str]],
+    plugin_specs: List[Dict[str, str]]
+) -> ClaudeAgentOptions:
+    """
+    Return a ClaudeAgentOptions instance, reused across sessions with identical settings.
+
+    The SDK never mutates the options it is given (it derives modified copies
+    via dataclasses.replace), so one instance can be shared by every session
+    in this process with the same configuration.
+
+    Args:
+        cwd: Working directory for Claude SDK
+        permission_mode: Claude permission mode ("acceptEdits" or "plan")
+        setting_sources: Settings tiers to load, or None for no filesystem settings
+        plugin_specs: Plugin specs from plugin_sdk_specs()
+
+    Returns:
+        Shared ClaudeAgentOptions instance
+    """
+    key = (
+        cwd,
+        permission_mode,
+        tuple(setting_sources) if setting_sources else None,
+        tuple(spec["path"] for spec in plugin_specs)
+    )
+
+    options = _options_cache.get(key)
+    if options is None:
+        options = _options_cache.setdefault(key, ClaudeAgentOptions(
+            permission_mode=permission_mode,
+            cwd=cwd,
+            setting_sources=setting_sources,
+            plugins=plugin_specs
+        ))
+    return options
+
+
+def _text_message(block: TextBlock) -> Dict:
+    """User-facing text (for HITL lock display)."""
+    return {
+        "type": "text",
+        "content": block.text
+    }
+
+
+def _thinking_message(block: ThinkingBlock) -> Dict:
+    """Extended thinking/reasoning output (context only)."""
+    return {
+        "type": "thinking",
+        "content": block.thinking,
+        "signature": block.signature
+    }
+
+
+def _tool_use_message(block: ToolUseBlock) -> Dict:
+    """Tool execution request (context only)."""
+    return {
+        "type": "tool_use",
+        "name": block.name,
+        "id": block.id,
+        "input": block.input
+    }
+
+
+def _tool_result_message(block: ToolResultBlock) -> Dict:
+    """Tool execution result (context only)."""
+    return offload_large_payload({
+        "type": "tool_result",
+        "tool_use_id": block.tool_use_id,
+        "content": block.content,
+        "is_error": block.is_error or False
+    }, "content")
+
+
+# Content block type -> message converter.
+# One dict lookup per block instead of an isinstance() chain.
+_BLOCK_CONVERTERS = {
+    TextBlock: _text_message,
+    ThinkingBlock: _thinking_message,
+    ToolUseBlock: _tool_use_message,
+    ToolResultBlock: _tool_result_message,
+}
+
+# Converters for callers that only need user-facing text
+_TEXT_CONVERTERS = {
+    TextBlock: _text_message,
+}
+
+
+class ClaudeSession:
+    """
+    Persistent state for a single Claude SDK session.
+
+    Runs as a dedicated Ray actor (ClaudeSessionActor) by default, or is
+    hosted alongside other sessions by ClaudeSessionPoolActor when
+    SESSION_POOL_SIZE is set.
 
     This actor:
     - Owns a ClaudeSDKClient instance with subprocess
@@ -170,48 +538,51 @@ class ClaudeSessionActor:
     1. Created via create_actor() with unique execution_id
     2. connect() initializes Claude SDK subprocess
     3. query() sends messages and collects responses
+       (connect_stream()/query_stream() yield messages as they arrive)
     4. disconnect() cleans up subprocess
-    5. Actor killed via cleanup_actor()
+    5. Actor killed (or session detached from its pool) via cleanup_actor()
     """
 
-    def __init__(self, cwd: Optional[str] = None, permission_mode: str = "acceptEdits"):
+    # Fixed attribute set: no per-instance __dict__ for sessions hosted by a
+    # ClaudeSessionPoolActor. (ray.remote() subclasses the class for dedicated
+    # actors, which adds a __dict__ back; that's one instance per process.)
+    __slots__ = (
+        "is_containerized", "execution_id", "num_cpus", "memory_bytes",
+        "cwd", "permission_mode", "plugin_infos", "settings", "options",
+        "setting_sources", "client", "connected", "last_activity",
+        "timeout_seconds", "_timeout_ns", "_init_task", "_timeout_handle", "_timeout_task",
+        "on_idle_disconnect",
+    )
+
+    def __init__(
+        self,
+        cwd: Optional[str] = None,
+        permission_mode: str = "acceptEdits",
+        execution_id: Optional[str] = None
+    ):
         """
         Initialize actor (subprocess not started yet).
 
+        Settings and plugins are loaded asynchronously by _ensure_initialized()
+        so actor construction does no file I/O.
+
         Args:
             cwd: Working directory for Claude SDK (default: current dir)
             permission_mode: Claude permission mode ("acceptEdits" or "plan")
+            execution_id: Conversation this session serves (used in log messages)
         """
         # Check if running in container
         # In container, HOME is set to /app/template_user by Dockerfile ENV
-        is_containerized = os.getenv("HOME") == "/app/template_user"
+        self.is_containerized = os.getenv("HOME") == "/app/template_user"
+
+        # Included in log messages so concurrent sessions are distinguishable in Ray logs
+        self.execution_id = execution_id
 
         # Store resource allocation (matches create_actor() settings)
-        self.num_cpus = 1
+        self.num_cpus = 0
         self.memory_bytes = 1024 * 1024 * 1024  # 1GB
 
-        # Load plugins from settings.json
-        plugin_specs = []
-        self.settings = None  # Store for metadata
-        if is_containerized:
-            # In container: Load plugins from marketplace settings
-            logger.info("=" * 70)
-            logger.info("PLUGIN LOADING")
-            logger.info("=" * 70)
-
-            self.settings = load_marketplace_settings()
-            plugin_specs = resolve_plugin_paths(self.settings)
-
-            if plugin_specs:
-                logger.info(f"Successfully loaded {len(plugin_specs)} plugins:")
-                for spec in plugin_specs:
-                    logger.info(f"  → {spec['path']}")
-            else:
-                logger.warning("No plugins loaded - agent will run without plugins")
-                logger.warning("Check that settings.json has enabledPlugins configured")
-
-            logger.info("=" * 70)
-
+        if self.is_containerized:
             # In container: Enable setting_sources to merge .claude folders
             # - "user" → /app/template_user/.claude/ (baked into image)
             # - "project" → .claude/ in deployed code directory
@@ -221,20 +592,25 @@ class ClaudeSessionActor:
             # Native execution: Don't load filesystem settings to avoid mixing with personal ~/.claude/
             setting_sources = None
 
-        self.options = ClaudeAgentOptions(
-            permission_mode=permission_mode,
-            cwd=cwd or os.getcwd(),
-            setting_sources=setting_sources,
-            plugins=plugin_specs  # Add loaded plugins
-        )
-        self.plugin_specs = plugin_specs  # Store for metadata
+        # Settings and plugins load asynchronously on first connect()/get_metadata()
+        self.cwd = cwd or os.getcwd()
+        self.permission_mode = permission_mode
+        self.plugin_infos: List[Dict] = []  # Capabilities cached for metadata
+        self.settings = None  # Store for metadata
+        self.options: Optional[ClaudeAgentOptions] = None
+        self._init_task: Optional[asyncio.Future] = None
         self.setting_sources = setting_sources  # Store for metadata
         self.client: Optional[ClaudeSDKClient] = None
         self.connected = False
-        self.last_activity = time.time()
+        self.last_activity = time.monotonic_ns()
         self.timeout_seconds = 660  # 11 minutes (10 min conversation + 1 min buffer)
+        self._timeout_ns = self.timeout_seconds * 1_000_000_000
+        self._timeout_handle: Optional[asyncio.TimerHandle] = None
+        self._timeout_task: Optional[asyncio.Task] = None
+        # Called after an idle-timeout disconnect (pool actors detach the session)
+        self.on_idle_disconnect: Optional[Callable[[], None]] = None
 
-    async def connect(self, prompt: str) -> Dict:
+    async def connect(self, prompt: str, include_context: bool = True) -> Dict:
         """
         Start Claude SDK session with initial prompt.
 
@@ -246,6 +622,8 @@ class ClaudeSessionActor:
 
         Args:
             prompt: Initial user prompt to start conversation
+            include_context: If False, only user-facing text is collected
+                             (context_messages stays empty)
 
         Returns:
             {
@@ -253,27 +631,44 @@ class ClaudeSessionActor:
                 "messages": [{"type": "text" | "tool", "content": str, ...}]
             }
         """
-        self.client = ClaudeSDKClient(options=self.options)
+        await self._start_session(prompt)
 
-        # IMPORTANT: Must use connect(None) to keep stdin open for control protocol
-        # Passing a string prompt directly causes "ProcessTransport not ready" error
-        await self.client.connect(None)
+        # Collect initial response
+        return await self._collect_response(include_context)
 
-        # Now send the initial prompt via query()
-        await self.client.query(prompt)
+    @ray.method(num_returns="streaming")
+    async def connect_stream(self, prompt: str, include_context: bool = True):
+        """
+        Start Claude SDK session and stream the initial response.
 
-        self.connected = True
-        self._update_activity()
+        Streaming variant of connect(): each message is yielded as soon as
+        Claude emits it instead of being batched into one return value.
+        The caller iterates the returned ObjectRef generator:
 
-        # Collect initial response
-        return await self._collect_response()
+            async for ref in actor.connect_stream.remote(prompt):
+                item = await ref
+
+        Args:
+            prompt: Initial user prompt to start conversation
+            include_context: If False, only user-facing text messages are yielded
+
+        Yields:
+            Message dicts (same schema as _collect_response entries),
+            followed by a terminal {"status": "ready" | "complete"} dict
+        """
+        await self._start_session(prompt)
+
+        async for item in self._stream_response(include_context):
+            yield item
 
-    async def query(self, message: str) -> Dict:
+    async def query(self, message: str, include_context: bool = True) -> Dict:
         """
         Send user message and collect Claude's response.
 
         Args:
             message: User's text input
+            include_context: If False, only user-facing text is collected
+                             (context_messages stays empty)
 
         Returns:
             {
@@ -282,33 +677,134 @@ class ClaudeSessionActor:
             }
 
         Raises:
-            RuntimeError: If not connected (call connect() first)
+            SessionNotConnectedError: If not connected (call connect() first)
+        """
+        await self._send(message)
+        return await self._collect_response(include_context)
+
+    @ray.method(num_returns="streaming")
+    async def query_stream(self, message: str, include_context: bool = True):
+        """
+        Send user message and stream Claude's response.
+
+        Streaming variant of query(), see connect_stream() for usage.
+
+        Args:
+            message: User's text input
+            include_context: If False, only user-facing text messages are yielded
+
+        Yields:
+            Message dicts followed by a terminal {"status": ...} dict
+
+        Raises:
+            SessionNotConnectedError: If not connected (call connect() first)
+        """
+        await self._send(message)
+
+        async for item in self._stream_response(include_context):
+            yield item
+
+    async def query_batch(self, messages: List[str], include_context: bool = True) -> List[Dict]:
+        """
+        Send several user messages within a single actor call.
+
+        Each message is sent once Claude has finished responding to the
+        previous one, exactly like sequential query() calls, but the whole
+        batch pays only one Ray task round-trip.
+
+        Args:
+            messages: User messages to send, in order
+            include_context: If False, only user-facing text is collected
+
+        Returns:
+            One response dict per message (same schema as query())
+
+        Raises:
+            SessionNotConnectedError: If not connected (call connect() first)
+        """
+        results = []
+        for message in messages:
+            await self._send(message)
+            results.append(await self._collect_response(include_context))
+        return results
+
+    async def _ensure_initialized(self):
         """
+        Load settings and plugins once.
+
+        Idempotent and safe to call concurrently: every caller awaits the
+        same initialization task.
+        """
+        if self._init_task is None:
+            self._init_task = asyncio.ensure_future(self._initialize())
+        await self._init_task
+
+    async def _initialize(self):
+        """Load plugins from settings.json and build the agent options."""
+        if self.is_containerized:
+            # In container: Load plugins from marketplace settings
+            logger.info("=" * 70)
+            logger.info("PLUGIN LOADING")
+            logger.info("=" * 70)
+
+            # Master and project settings are read concurrently
+            self.settings = await aload_marketplace_settings()
+            self.plugin_infos = await asyncio.to_thread(resolve_plugin_paths, self.settings)
+
+            if self.plugin_infos:
+                logger.info("Successfully loaded %s plugins:", len(self.plugin_infos))
+                for info in self.plugin_infos:
+                    logger.info("  → %s", info['path'])
+            else:
+                logger.warning("No plugins loaded - agent will run without plugins")
+                logger.warning("Check that settings.json has enabledPlugins configured")
+
+            logger.info("=" * 70)
+
+        self.options = get_agent_options(
+            cwd=self.cwd,
+            permission_mode=self.permission_mode,
+            setting_sources=self.setting_sources,
+            plugin_specs=plugin_sdk_specs(self.plugin_infos)  # Add loaded plugins
+        )
+
+    async def _start_session(self, prompt: str):
+        """Create the SDK client, spawn the CLI subprocess and send the initial prompt."""
+        await self._ensure_initialized()
+        self.client = ClaudeSDKClient(options=self.options)
+
+        # IMPORTANT: Must use connect(None) to keep stdin open for control protocol
+        # Passing a string prompt directly causes "ProcessTransport not ready" error
+        await self.client.connect(None)
+
+        # Now send the initial prompt via query()
+        await self.client.query(prompt)
+
+        self.connected = True
+        self._update_activity()
+
+    async def _send(self, message: str):
+        """Send a user message on an already connected session."""
         if not self.client or not self.connected:
-            raise RuntimeError("Not connected. Call connect() first.")
+            raise SessionNotConnectedError("Not connected. Call connect() first.")
 
         self._update_activity()
         await self.client.query(message)
-        return await self._collect_response()
 
-    async def _collect_response(self) -> Dict:
+    async def _collect_response(self, include_context: bool = True) -> Dict:
         """
         Collect all messages from Claude until ready for next user input.
 
-        This method streams messages from the Claude SDK and batches them
+        This method drains _stream_response() and batches the messages
         until the stream is exhausted (indicating Claude is waiting for input).
 
         Messages are categorized into two types:
         - user_messages: Clean, final messages for HITL lock form (TextBlock only)
         - context_messages: Rich execution context for admin panel (thinking, tool results, system)
 
-        Message Types Handled:
-        - TextBlock: Claude's text response (user-facing)
-        - ThinkingBlock: Claude's internal reasoning (context)
-        - ToolUseBlock: Tool execution request (context)
-        - ToolResultBlock: Tool execution result (context)
-        - SystemMessage: System events/metadata (context)
-        - ResultMessage: Task completed
+        Args:
+            include_context: If False, context messages are never built
+                             and context_messages is returned empty
 
         Returns:
             {
@@ -321,86 +817,124 @@ class ClaudeSessionActor:
                     {"type": "system", "subtype": "...", "data": {...}}
                 ]
             }
+
+            Oversized string tool_result contents are replaced by a preview
+            plus a "content_ref" ObjectRef (see offload_large_payload()).
         """
+        # Records are deliberately plain dicts of builtin values: Ray encodes
+        # those natively with msgpack, whereas tuples, namedtuples and
+        # dataclasses fall back to pickle. user_messages are also forwarded
+        # to the Kodosumi lock form as JSON, which requires dicts.
         user_messages = []
         context_messages = []
+        # Bound-method aliases keep the per-message loop free of attribute lookups
+        append_user = user_messages.append
+        append_context = context_messages.append
 
-        async for message in self.client.receive_response():
-            # Check if task is complete
-            if isinstance(message, ResultMessage):
+        async for item in self._stream_response(include_context):
+            # Terminal status entry carries no message type
+            if "status" in item:
                 return {
-                    "status": "complete",
                     "user_messages": user_messages,
                     "context_messages": context_messages,
+                    **item
+                }
+
+            if item["type"] == "text":
+                append_user(item)
+            else:
+                append_context(item)
+
+    async def _stream_response(self, include_context: bool = True):
+        """
+        Stream messages from Claude until ready for next user input.
+
+        Message Types Handled:
+        - TextBlock: Claude's text response (user-facing)
+        - ThinkingBlock: Claude's internal reasoning (context)
+        - ToolUseBlock: Tool execution request (context)
+        - ToolResultBlock: Tool execution result (context)
+        - SystemMessage: System events/metadata (context)
+        - ResultMessage: Task completed
+
+        Args:
+            include_context: If False, only TextBlocks are converted; thinking,
+                             tool and system messages are skipped entirely
+
+        Yields:
+            One message dict per block, then exactly one terminal entry:
+            {"status": "ready"} or
+            {"status": "complete", "completion_type": "sdk_result_message" | "text_marker"}
+        """
+        text_completion_signal = False
+        # Local aliases: LOAD_FAST instead of global/attribute lookups per block
+        get_converter = (_BLOCK_CONVERTERS if include_context else _TEXT_CONVERTERS).get
+        marker = COMPLETION_MARKER
+        type_of = type
+        result_cls, assistant_cls, system_cls = ResultMessage, AssistantMessage, SystemMessage
+
+        async for message in self.client.receive_response():
+            # Exact type identity: one type() call per message instead of
+            # up to three isinstance() checks (SDK message classes aren't subclassed)
+            message_type = type_of(message)
+
+            # Check if task is complete
+            if message_type is result_cls:
+                # Idle time (the HITL wait) starts when the turn ends
+                self._update_activity()
+                yield {
+                    "status": "complete",
                     "completion_type": "sdk_result_message"
                 }
+                return
+
+            # Process assistant messages
+            elif message_type is assistant_cls:
+                for block in message.content:
+                    convert = get_converter(type_of(block))
+                    if convert is None:
+                        continue
+
+                    item = convert(block)
+                    if item["type"] == "text" and marker in item["content"]:
+                        text_completion_signal = True
+                    yield item
 
             # Process system messages
-            if isinstance(message, SystemMessage):
-                context_messages.append({
+            elif message_type is system_cls and include_context:
+                yield {
                     "type": "system",
                     "subtype": message.subtype,
                     "data": message.data
-                })
+                }
 
-            # Process assistant messages
-            if isinstance(message, AssistantMessage):
-                for block in message.content:
-                    if isinstance(block, TextBlock):
-                        # User-facing text goes to both (for HITL lock display)
-                        user_messages.append({
-                            "type": "text",
-                            "content": block.text
-                        })
-                    elif isinstance(block, ThinkingBlock):
-                        # Extended thinking/reasoning output (context only)
-                        context_messages.append({
-                            "type": "thinking",
-                            "content": block.thinking,
-                            "signature": block.signature
-                        })
-                    elif isinstance(block, ToolUseBlock):
-                        # Tool execution request (context only)
-                        context_messages.append({
-                            "type": "tool_use",
-                            "name": block.name,
-                            "id": block.id,
-                            "input": block.input
-                        })
-                    elif isinstance(block, ToolResultBlock):
-                        # Tool execution result (context only)
-                        context_messages.append({
-                            "type": "tool_result",
-                            "tool_use_id": block.tool_use_id,
-                            "content": block.content,
-                            "is_error": block.is_error or False
-                        })
+        # Idle time (the HITL wait) starts when the turn ends
+        self._update_activity()
 
         # Stream exhausted - Check for text-based completion signal (fallback)
-        if self._check_text_completion_signal(user_messages):
-            return {
+        if text_completion_signal:
+            yield {
                 "status": "complete",
-                "user_messages": user_messages,
-                "context_messages": context_messages,
                 "completion_type": "text_marker"
             }
+            return
 
         # No completion signal - Claude is ready for next input
-        return {
-            "status": "ready",
-            "user_messages": user_messages,
-            "context_messages": context_messages
-        }
+        yield {"status": "ready"}
 
     async def check_timeout(self) -> bool:
         """
         Check if actor has exceeded idle timeout.
 
+        The actor disconnects itself once the idle deadline passes (see
+        _update_activity()), so callers don't need to poll this. It is kept
+        for diagnostics and debugging.
+
         Returns:
             True if timed out, False otherwise
         """
-        elapsed = time.time() - self.last_activity
-        return elapsed > self.timeout_seconds
+        # Integer nanoseconds: immune to wall-clock jumps, no float math
+        return time.monotonic_ns() - self.last_activity > self._timeout_ns
 
     async def disconnect(self) -> Dict:
         """
@@ -412,17 +946,47 @@ class ClaudeSessionActor:
         Returns:
             {"status": "disconnected"}
         """
+        if self._timeout_handle:
+            self._timeout_handle.cancel()
+            self._timeout_handle = None
+
         if self.client:
             try:
                 await self.client.disconnect()
-            except Exception as e:
-                print(f"Disconnect error: {e}")
+            except Exception:
+                logger.warning("Disconnect error for session %s", self.execution_id, exc_info=True)
             finally:
                 self.client = None
 
         self.connected = False
         return {"status": "disconnected"}
 
+    async def reset(self) -> Dict:
+        """
+        Drop the Claude SDK session so the actor can host a new conversation.
+
+        Settings, plugins and options stay initialized; the next connect()
+        starts a fresh session with a fresh idle clock.
+
+        Returns:
+            {"status": "reset"}
+        """
+        await self.disconnect()
+        self.last_activity = time.monotonic_ns()
+        return {"status": "reset"}
+
+    async def get_pid(self) -> int:
+        """
+        Get the ID of the worker process hosting this session.
+
+        Used for diagnostics, e.g. to confirm an actor kept its worker
+        across resets.
+
+        Returns:
+            OS process ID
+        """
+        return os.getpid()
+
     async def get_metadata(self) -> Dict:
         """
         Get comprehensive metadata about agent configuration.
@@ -437,6 +1001,8 @@ class ClaudeSessionActor:
         Returns:
             Dict with metadata organized by category
         """
+        await self._ensure_initialized()
+
         metadata = {
             "container": get_container_image_config(),
             "resources": {
@@ -451,135 +1017,269 @@ class ClaudeSessionActor:
             "plugins": []
         }
 
-        # Scan plugins for capabilities
-        for plugin_spec in self.plugin_specs:
-            plugin_path = Path(plugin_spec["path"])
-            plugin_name = plugin_path.name
-            marketplace_name = plugin_path.parent.parent.parent.name
-
-            plugin_info = {
-                "name": plugin_name,
-                "marketplace": marketplace_name,
-                "path": str(plugin_path),
-                "commands": [],
-                "agents": [],
-                "skills": [],
-                "mcp_servers": []
-            }
+        # Plugin capabilities were scanned once at load time
+        metadata["plugins"] = [
+            {key: value for key, value in info.items() if key != "type"}
+            for info in self.plugin_infos
+        ]
 
-            # Scan for commands (*.md in commands/)
-            commands_dir = plugin_path / "commands"
-            if commands_dir.exists():
-                for cmd_file in commands_dir.glob("*.md"):
-                    plugin_info["commands"].append(cmd_file.stem)
-
-            # Scan for agents (*.md in agents/)
-            agents_dir = plugin_path / "agents"
-            if agents_dir.exists():
-                for agent_file in agents_dir.glob("*.md"):
-                    plugin_info["agents"].append(agent_file.stem)
-
-            # Scan for skills (subdirectories in skills/)
-            skills_dir = plugin_path / "skills"
-            if skills_dir.exists():
-                for skill_dir in skills_dir.iterdir():
-                    if skill_dir.is_dir() and not skill_dir.name.startswith("."):
-                        plugin_info["skills"].append(skill_dir.name)
-
-            # Check for MCP servers in plugin settings.json
-            plugin_settings_path = plugin_path / "settings.json"
-            if plugin_settings_path.exists():
-                try:
-                    plugin_settings = json.loads(plugin_settings_path.read_text())
-                    mcp_servers = plugin_settings.get("mcp_servers", {})
-                    plugin_info["mcp_servers"] = list(mcp_servers.keys())
-                except Exception as e:
-                    logger.warning(f"Failed to read plugin settings from {plugin_settings_path}: {e}")
-
-            metadata["plugins"].append(plugin_info)
-
-        # Get permissions from settings
+        # Permissions were merged when settings were loaded
         if self.settings:
-            # Read permissions from both master and project configs
-            permissions = set()
-
-            # Master permissions
-            master_settings_path = Path("/app/template_user/.claude/settings.json")
-            if master_settings_path.exists():
-                try:
-                    data = json.loads(master_settings_path.read_text())
-                    perms = data.get("permissions", {}).get("allow", [])
-                    permissions.update(perms)
-                except Exception as e:
-                    logger.warning(f"Failed to read master permissions: {e}")
-
-            # Project permissions (overrides/adds to master)
-            project_settings_path = Path("/app/.claude/settings.json")
-            if project_settings_path.exists():
-                try:
-                    data = json.loads(project_settings_path.read_text())
-                    perms = data.get("permissions", {}).get("allow", [])
-                    permissions.update(perms)
-                except Exception as e:
-                    logger.warning(f"Failed to read project permissions: {e}")
-
-            metadata["settings"]["permissions"] = sorted(list(permissions))
+            metadata["settings"]["permissions"] = self.settings["permissions"]
 
         return metadata
 
-    def _check_text_completion_signal(self, messages: list) -> bool:
+    def _update_activity(self):
+        """Update last activity timestamp and re-arm the idle deadline."""
+        self.last_activity = time.monotonic_ns()
+
+        # Let the event loop wake us at the deadline instead of being polled
+        if self._timeout_handle:
+            self._timeout_handle.cancel()
+        self._timeout_handle = asyncio.get_running_loop().call_later(
+            self.timeout_seconds, self._on_idle_timeout
+        )
+
+    def _on_idle_timeout(self):
+        """Idle deadline reached: disconnect the Claude SDK subprocess."""
+        self._timeout_handle = None
+        # Keep a reference so the task isn't garbage collected mid-flight
+        self._timeout_task = asyncio.create_task(self._disconnect_idle())
+
+    async def _disconnect_idle(self):
+        """Disconnect a session that exceeded the idle timeout."""
+        logger.warning(
+            "Session %s idle for more than %ss, disconnecting", self.execution_id, self.timeout_seconds
+        )
+        await self.disconnect()
+        if self.on_idle_disconnect is not None:
+            self.on_idle_disconnect()
+
+
+# One dedicated actor per session (default)
+ClaudeSessionActor = ray.remote(ClaudeSession)
+
+
+@ray.remote
+class ClaudeSessionPoolActor:
+    """
+    Ray Actor hosting many Claude SDK sessions, keyed by execution_id.
+
+    Used when SESSION_POOL_SIZE > 0: K long-lived pool actors multiplex all
+    sessions instead of reserving one actor per (mostly idle) HITL session.
+    Every method mirrors ClaudeSession with execution_id as first argument;
+    use a PooledSessionHandle to call them like a dedicated actor.
+    """
+
+    def __init__(self, cwd: Optional[str] = None, permission_mode: str = "acceptEdits"):
         """
-        Check if any text message contains completion signal marker.
+        Initialize an empty pool.
 
-        Returns:
-            True if completion signal found, False otherwise
+        Args:
+            cwd: Working directory for hosted sessions
+            permission_mode: Claude permission mode for hosted sessions
         """
-        COMPLETION_MARKER = "[TASK_COMPLETE]"
+        self.cwd = cwd
+        self.permission_mode = permission_mode
+        self.sessions: Dict[str, ClaudeSession] = {}
 
-        for msg in messages:
-            if msg.get("type") == "text":
-                content = msg.get("content", "")
-                if COMPLETION_MARKER in content:
-                    return True
+    def _session(self, execution_id: str, create: bool = False) -> ClaudeSession:
+        """
+        Return the session for execution_id.
 
-        return False
+        Only attach() and connect*() create sessions; every other method
+        must not bring back a session that was detached by disconnect() or
+        an idle timeout.
 
-    def _update_activity(self):
-        """Update last activity timestamp."""
-        self.last_activity = time.time()
+        Args:
+            execution_id: Session key
+            create: Create and attach the session if it doesn't exist
+
+        Raises:
+            SessionNotConnectedError: If no session is attached and create is False
+        """
+        session = self.sessions.get(execution_id)
+        if session is None:
+            if not create:
+                raise SessionNotConnectedError(f"No session attached for {execution_id}")
+            session = ClaudeSession(
+                cwd=self.cwd, permission_mode=self.permission_mode, execution_id=execution_id
+            )
+            session.on_idle_disconnect = functools.partial(self._detach, execution_id, session)
+            self.sessions[execution_id] = session
+        return session
+
+    def _detach(self, execution_id: str, session: ClaudeSession):
+        """Drop session from the pool unless execution_id was re-attached since."""
+        if self.sessions.get(execution_id) is session:
+            del self.sessions[execution_id]
+
+    async def attach(self, execution_id: str) -> bool:
+        """Register a session for execution_id (idempotent)."""
+        self._session(execution_id, create=True)
+        return True
+
+    async def has_session(self, execution_id: str) -> bool:
+        """Check whether a session for execution_id is attached."""
+        return execution_id in self.sessions
+
+    async def session_count(self) -> int:
+        """Number of sessions currently hosted by this pool actor."""
+        return len(self.sessions)
+
+    async def connect(self, execution_id: str, prompt: str, include_context: bool = True) -> Dict:
+        """See ClaudeSession.connect()."""
+        return await self._session(execution_id, create=True).connect(prompt, include_context)
+
+    @ray.method(num_returns="streaming")
+    async def connect_stream(self, execution_id: str, prompt: str, include_context: bool = True):
+        """See ClaudeSession.connect_stream()."""
+        async for item in self._session(execution_id, create=True).connect_stream(prompt, include_context):
+            yield item
+
+    async def query(self, execution_id: str, message: str, include_context: bool = True) -> Dict:
+        """See ClaudeSession.query()."""
+        return await self._session(execution_id).query(message, include_context)
+
+    @ray.method(num_returns="streaming")
+    async def query_stream(self, execution_id: str, message: str, include_context: bool = True):
+        """See ClaudeSession.query_stream()."""
+        async for item in self._session(execution_id).query_stream(message, include_context):
+            yield item
+
+    async def query_batch(self, execution_id: str, messages: List[str], include_context: bool = True) -> List[Dict]:
+        """See ClaudeSession.query_batch()."""
+        return await self._session(execution_id).query_batch(messages, include_context)
+
+    async def check_timeout(self, execution_id: str) -> bool:
+        """See ClaudeSession.check_timeout()."""
+        return await self._session(execution_id).check_timeout()
+
+    async def get_metadata(self, execution_id: str) -> Dict:
+        """See ClaudeSession.get_metadata()."""
+        return await self._session(execution_id).get_metadata()
+
+    async def reset(self, execution_id: str) -> Dict:
+        """See ClaudeSession.reset()."""
+        return await self._session(execution_id).reset()
+
+    async def get_pid(self, execution_id: str) -> int:
+        """See ClaudeSession.get_pid()."""
+        return await self._session(execution_id).get_pid()
+
+    async def disconnect(self, execution_id: str) -> Dict:
+        """Disconnect the session and detach it from the pool."""
+        session = self.sessions.pop(execution_id, None)
+        if session is None:
+            return {"status": "disconnected"}
+        return await session.disconnect()
+
+
+class _PooledMethod:
+    """Actor method with execution_id bound as first argument."""
+
+    def __init__(self, method, execution_id: str):
+        self._method = method
+        self._execution_id = execution_id
+
+    def remote(self, *args, **kwargs):
+        return self._method.remote(self._execution_id, *args, **kwargs)
+
+    def options(self, **options):
+        return _PooledMethod(self._method.options(**options), self._execution_id)
+
+
+class PooledSessionHandle:
+    """
+    Handle to a session hosted by a ClaudeSessionPoolActor.
+
+    Exposes the same `.method.remote(...)` interface as a ClaudeSessionActor
+    handle, so callers don't need to know whether sessions are pooled.
+    """
+
+    def __init__(self, pool: ray.actor.ActorHandle, execution_id: str):
+        self.pool = pool
+        self.execution_id = execution_id
+
+    def __getattr__(self, name: str) -> _PooledMethod:
+        return _PooledMethod(getattr(self.pool, name), self.execution_id)
+
+
+@functools.lru_cache(maxsize=1)
+def get_session_pool_size() -> int:
+    """
+    Number of pool actors from SESSION_POOL_SIZE (0 = one actor per session).
+
+    Returns:
+        Pool size (cached per process)
+    """
+    try:
+        return max(0, int(os.getenv("SESSION_POOL_SIZE", "0")))
+    except ValueError:
+        logger.warning("Invalid SESSION_POOL_SIZE value, using dedicated actors")
+        return 0
+
+
+def _pool_actor_name(execution_id: str, pool_size: int) -> str:
+    """
+    Route an execution_id to a pool actor name.
+
+    Uses crc32 rather than hash(): str hashes are salted per process, and
+    every Ray worker must route the same execution_id to the same actor.
+    """
+    return f"claude-session-pool-{zlib.crc32(execution_id.encode()) % pool_size}"
 
 
 # Helper functions for actor management
 
-def create_actor(execution_id: str, cwd: Optional[str] = None, use_container: Optional[bool] = None) -> ray.actor.ActorHandle:
+async def iter_stream(ref_generator) -> AsyncIterator[Dict]:
     """
-    Create a new ClaudeSessionActor with unique name.
+    Resolve a streaming actor call record by record.
 
-    The actor is created with:
-    - Named: "claude-session-{execution_id}" for retrieval
-    - Detached lifetime: Survives driver crashes
-    - No auto-restart: Subprocess can't be recovered
-    - Resource allocation: 1 CPU, 1GB memory
-    - Optional: Container runtime for .claude/ folder isolation
+    Wraps the ObjectRefGenerator returned by connect_stream.remote() or
+    query_stream.remote() so callers can handle each message as soon as
+    the actor yields it:
+
+        async for record in iter_stream(actor.query_stream.remote(text)):
+            ...
 
     Args:
-        execution_id: Unique identifier for this conversation
-        cwd: Working directory for Claude SDK (default: current dir)
-        use_container: If True, run actor in container with isolated .claude folders.
-                      If None (default), auto-detects from CONTAINER_IMAGE_URI env var.
-                      Requires image URI with digest in environment configuration.
+        ref_generator: ObjectRefGenerator from a streaming actor method
+
+    Yields:
+        Message dicts, then one terminal dict with "status"
+    """
+    async for ref in ref_generator:
+        yield await ref
+
+
+def _actor_options(
+    cwd: Optional[str],
+    use_container: Optional[bool],
+    colocate: bool,
+    lifetime: Optional[str],
+    max_restarts: int
+) -> tuple:
+    """
+    Build the runtime environment and scheduling options shared by session actors.
+
+    Args:
+        cwd: See create_actor()
+        use_container: See create_actor()
+        colocate: See create_actor()
+        lifetime: See create_actor()
+        max_restarts: See create_actor()
 
     Returns:
-        Ray actor handle
+        (options dict for ActorClass.options(), cwd to pass to the actor)
     """
     from ray.runtime_env import RuntimeEnv
-
-    actor_name = f"claude-session-{execution_id}"
+    from ray.util.scheduling_strategies import NodeAffinitySchedulingStrategy
 
     # Get project root
     project_root = cwd or os.getcwd()
 
-    # Get container image configuration from environment
+    # Container image configuration (parsed once per process)
     image_config = get_container_image_config()
 
     # Auto-detect container usage from environment if not explicitly set
@@ -597,13 +1297,7 @@ def create_actor(execution_id: str, cwd: Optional[str] = None, use_container: Op
         # Format: ghcr.io/<username>/claude-hitl-worker@sha256:<digest>
         runtime_env = RuntimeEnv(
             image_uri=image_config["uri"],  # Full URI with digest from CONTAINER_IMAGE_URI env var
-            env_vars={
-                "ANTHROPIC_API_KEY": os.getenv("ANTHROPIC_API_KEY", ""),
-                "CONTAINER_IMAGE_URI": image_config["uri"],      # Pass to actor for logging
-                "CONTAINER_IMAGE_DIGEST": image_config["digest"], # Pass digest for validation
-                # HOME is set to /app/template_user in Dockerfile
-                # This makes "user" settings load from master config .claude/
-            }
+            env_vars=_container_env_vars()  # Cached per process
         )
         # Ray will deploy code to container, actor runs in that context
         actor_cwd = None  # Let Ray handle cwd
@@ -612,14 +1306,118 @@ def create_actor(execution_id: str, cwd: Optional[str] = None, use_container: Op
         runtime_env = None
         actor_cwd = project_root
 
-    return ClaudeSessionActor.options(
-        name=actor_name,
-        runtime_env=runtime_env,
-        lifetime="detached",       # Survives driver crashes
-        max_restarts=0,             # Don't auto-restart (subprocess can't recover)
-        num_cpus=1,                 # 1 CPU for actor + subprocess
-        memory=1024 * 1024 * 1024   # 1GB (recommended by Claude SDK docs)
-    ).remote(cwd=actor_cwd)
+    # Co-locate with the orchestrator so every HITL round-trip stays on this node
+    # soft=True: schedule elsewhere instead of waiting if this node is full
+    scheduling_strategy = None
+    if colocate and ray.is_initialized():
+        scheduling_strategy = NodeAffinitySchedulingStrategy(
+            node_id=ray.get_runtime_context().get_node_id(),
+            soft=True
+        )
+
+    options = {
+        "runtime_env": runtime_env,
+        "scheduling_strategy": scheduling_strategy,
+        "lifetime": lifetime,         # "detached" survives driver crashes
+        "max_restarts": max_restarts, # 0: don't auto-restart (subprocess can't recover)
+        "num_cpus": 0,                # I/O-bound: waits on the CLI subprocess
+        "memory": 1024 * 1024 * 1024  # 1GB (recommended by Claude SDK docs)
+    }
+    return options, actor_cwd
+
+
+def create_actor(
+    execution_id: str,
+    cwd: Optional[str] = None,
+    use_container: Optional[bool] = None,
+    colocate: bool = True,
+    lifetime: Optional[str] = "detached",
+    max_restarts: int = 0,
+    timeout_s: Optional[float] = None
+) -> ray.actor.ActorHandle:
+    """
+    Create a new ClaudeSessionActor with unique name.
+
+    If SESSION_POOL_SIZE > 0, the session is instead attached to one of
+    K shared ClaudeSessionPoolActors and a PooledSessionHandle is returned.
+
+    The actor is created with:
+    - Named: "claude-session-{execution_id}" for retrieval
+    - Detached lifetime (default): Survives driver crashes
+    - No auto-restart (default): Subprocess can't be recovered
+    - Resource allocation: 0 CPUs (I/O-bound), 1GB memory
+    - Soft node affinity to the calling process (keeps HITL RPCs node-local)
+    - Optional: Container runtime for .claude/ folder isolation
+
+    Args:
+        execution_id: Unique identifier for this conversation
+        cwd: Working directory for Claude SDK (default: current dir)
+        use_container: If True, run actor in container with isolated .claude folders.
+                      If None (default), auto-detects from CONTAINER_IMAGE_URI env var.
+                      Requires image URI with digest in environment configuration.
+        colocate: If True (default), prefer scheduling the actor on the node running
+                  the orchestrator. Falls back to any node if that node lacks resources.
+        lifetime: "detached" (default) keeps the actor alive if the driver dies;
+                  None ties it to the driver so Ray reclaims it with the job.
+        max_restarts: Ray restarts on actor death (default 0). A restarted actor
+                      comes back with a fresh, disconnected session.
+        timeout_s: If set, cleanup_actor() runs after this many seconds no matter
+                   how the conversation ends (requires a running event loop).
+                   Guards against leaked detached actors when cleanup is missed.
+
+    Returns:
+        Ray actor handle (or PooledSessionHandle in pooled mode)
+    """
+    options, actor_cwd = _actor_options(cwd, use_container, colocate, lifetime, max_restarts)
+
+    pool_size = get_session_pool_size()
+    if pool_size:
+        # Pooled mode: attach to one of K shared pool actors
+        pool = ClaudeSessionPoolActor.options(
+            name=_pool_actor_name(execution_id, pool_size),
+            get_if_exists=True,
+            **options
+        ).remote(cwd=actor_cwd)
+        pool.attach.remote(execution_id)
+        actor = PooledSessionHandle(pool, execution_id)
+    else:
+        actor = ClaudeSessionActor.options(
+            name=f"claude-session-{execution_id}",
+            **options
+        ).remote(cwd=actor_cwd, execution_id=execution_id)
+
+    with _actor_cache_lock:
+        _actor_cache[execution_id] = actor
+
+    if timeout_s is not None:
+        _arm_watchdog(execution_id, timeout_s)
+
+    return actor
+
+
+def _arm_watchdog(execution_id: str, timeout_s: float):
+    """
+    Schedule cleanup_actor() for execution_id after timeout_s seconds.
+
+    Cancelled by cleanup_actor(), so normal teardown disarms it.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        logger.warning("No running event loop, watchdog for %s not armed", execution_id)
+        return
+
+    def expire():
+        _actor_watchdogs.pop(execution_id, None)
+        logger.warning("Session %s exceeded %ss lifetime, cleaning up", execution_id, timeout_s)
+        task = loop.create_task(cleanup_actor(execution_id))
+        _watchdog_tasks.add(task)
+        task.add_done_callback(_watchdog_tasks.discard)
+
+    previous = _actor_watchdogs.pop(execution_id, None)
+    if previous is not None:
+        previous.cancel()
+    _actor_watchdogs[execution_id] = loop.call_later(timeout_s, expire)
 
 
 def get_actor(execution_id: str) -> Optional[ray.actor.ActorHandle]:
@@ -631,23 +1429,67 @@ def get_actor(execution_id: str) -> Optional[ray.actor.ActorHandle]:
     - Checking if actor still exists
     - Recovering actor handle after worker restart
 
+    Handles are served from _actor_cache when present; otherwise the GCS
+    lookup result is cached for the next call.
+
+    Args:
+        execution_id: Unique identifier for conversation
+
+    Returns:
+        Actor handle (PooledSessionHandle in pooled mode) or None if not found
+    """
+    with _actor_cache_lock:
+        actor = _actor_cache.get(execution_id)
+    if actor is not None:
+        return actor
+
+    pool_size = get_session_pool_size()
+    if pool_size:
+        try:
+            pool = ray.get_actor(_pool_actor_name(execution_id, pool_size))
+            found = ray.get(pool.has_session.remote(execution_id))
+        except ValueError:
+            found = False
+        actor = PooledSessionHandle(pool, execution_id) if found else None
+    else:
+        try:
+            actor = ray.get_actor(f"claude-session-{execution_id}")
+        except ValueError:
+            # Actor doesn't exist
+            actor = None
+
+    with _actor_cache_lock:
+        if actor is None:
+            _actor_cache.pop(execution_id, None)
+        else:
+            _actor_cache[execution_id] = actor
+    return actor
+
+
+async def aget_actor(execution_id: str) -> Optional[ray.actor.ActorHandle]:
+    """
+    Async variant of get_actor() for use inside event-loop code.
+
+    Cached handles are returned directly; on a cache miss the blocking
+    GCS lookup runs in the default thread pool executor.
+
     Args:
         execution_id: Unique identifier for conversation
 
     Returns:
         Actor handle or None if not found
     """
-    actor_name = f"claude-session-{execution_id}"
-    try:
-        return ray.get_actor(actor_name)
-    except ValueError:
-        # Actor doesn't exist
-        return None
+    with _actor_cache_lock:
+        actor = _actor_cache.get(execution_id)
+    if actor is not None:
+        return actor
+
+    return await asyncio.get_running_loop().run_in_executor(None, get_actor, execution_id)
 
 
-async def cleanup_actor(execution_id: str):
+async def cleanup_actor(execution_id: str, disconnect: bool = True):
     """
-    Disconnect and kill actor.
+    Disconnect and kill actor (pooled sessions are detached instead).
 
     This should be called:
     - When conversation ends normally
@@ -658,17 +1500,58 @@ async def cleanup_actor(execution_id: str):
 
     Args:
         execution_id: Unique identifier for conversation
+        disconnect: Skip the disconnect RPC when the caller already
+                    disconnected the session (the actor is still killed)
     """
-    actor = get_actor(execution_id)
+    watchdog = _actor_watchdogs.pop(execution_id, None)
+    if watchdog is not None:
+        watchdog.cancel()
+
+    actor = await aget_actor(execution_id)
+
+    # Drop cached handle so later lookups don't return a dead actor
+    with _actor_cache_lock:
+        _actor_cache.pop(execution_id, None)
+
     if actor:
-        try:
-            # Disconnect Claude SDK subprocess
-            await actor.disconnect.remote()
-        except Exception as e:
-            print(f"Disconnect error for {execution_id}: {e}")
+        if disconnect:
+            try:
+                # Disconnect Claude SDK subprocess
+                await actor.disconnect.remote()
+            except Exception as e:
+                logger.warning("Disconnect error for %s: %s", execution_id, e)
+
+        if isinstance(actor, PooledSessionHandle):
+            # disconnect() already detached the session; the pool actor lives on
+            return
 
         try:
-            # Kill the actor
-            ray.kill(actor)
+            # Kill the actor (blocking GCS call, keep it off the event loop)
+            await asyncio.get_running_loop().run_in_executor(None, ray.kill, actor)
         except Exception as e:
-            print(f"Kill error for {execution_id}: {e}")
+            logger.warning("Kill error for %s: %s", execution_id, e)
+
+
+async def cleanup_actors(execution_ids: List[str]):
+    """
+    Disconnect and kill several actors concurrently.
+
+    Runs cleanup_actor() for up to MAX_PENDING_CLEANUPS execution_ids at
+    once, so tearing down N sessions takes about N / MAX_PENDING_CLEANUPS
+    disconnect round-trips while the number of in-flight disconnect and
+    kill RPCs stays bounded for large batches.
+    Errors are logged per actor and never abort the other cleanups.
+
+    Args:
+        execution_ids: Unique identifiers for the conversations to clean up
+    """
+    semaphore = asyncio.Semaphore(MAX_PENDING_CLEANUPS)
+
+    async def bounded_cleanup(execution_id: str):
+        async with semaphore:
+            await cleanup_actor(execution_id)
+
+    await asyncio.gather(
+        *(bounded_cleanup(execution_id) for execution_id in execution_ids),
+        return_exceptions=True
+    )
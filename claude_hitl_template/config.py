@@ -13,38 +13,43 @@ Runtime behavior should use environment variables or CLAUDE.md instructions.
 
 import os
 import logging
-from typing import Dict, List
+import functools
+from types import MappingProxyType
+from typing import Dict, FrozenSet
 
 logger = logging.getLogger(__name__)
 
-# Default configuration
-DEFAULT_CONFIG = {
-    "completion_mode": "auto-complete",  # or "continuous"
-    "upload_files": True,
-    "max_turns": 50,
-    "file_exclusions": [
-        # Source code files
-        ".py", ".pyc", ".pyo", ".pyd",
+# File extensions and directory names never uploaded to Kodosumi
+FILE_EXCLUSIONS: FrozenSet[str] = frozenset({
+    # Source code files
+    ".py", ".pyc", ".pyo", ".pyd",
 
-        # Config files
-        ".json", ".yaml", ".yml", ".toml", ".ini",
+    # Config files
+    ".json", ".yaml", ".yml", ".toml", ".ini",
 
-        # Python artifacts
-        ".egg-info", ".dist-info", "__pycache__",
+    # Python artifacts
+    ".egg-info", ".dist-info", "__pycache__",
 
-        # Virtual environments
-        ".venv", "venv", "env",
+    # Virtual environments
+    ".venv", "venv", "env",
 
-        # Version control
-        ".git", ".gitignore", ".gitattributes",
+    # Version control
+    ".git", ".gitignore", ".gitattributes",
 
-        # IDE files
-        ".vscode", ".idea", ".pytest_cache",
+    # IDE files
+    ".vscode", ".idea", ".pytest_cache",
 
-        # Other
-        ".md", ".txt", ".log"
-    ]
-}
+    # Other
+    ".md", ".txt", ".log"
+})
+
+# Default configuration (read-only; load_kodosumi_config() returns a fresh dict)
+DEFAULT_CONFIG = MappingProxyType({
+    "completion_mode": "auto-complete",  # or "continuous"
+    "upload_files": True,
+    "max_turns": 50,
+    "file_exclusions": FILE_EXCLUSIONS
+})
 
 
 def load_kodosumi_config() -> Dict:
@@ -61,9 +66,9 @@ def load_kodosumi_config() -> Dict:
         - completion_mode: str
         - upload_files: bool
         - max_turns: int
-        - file_exclusions: List[str]
+        - file_exclusions: FrozenSet[str] (shared, immutable)
     """
-    config = DEFAULT_CONFIG.copy()
+    config = dict(DEFAULT_CONFIG)
 
     # Load completion mode
     completion_mode = os.getenv("COMPLETION_MODE", "").lower()
@@ -88,11 +93,48 @@ def load_kodosumi_config() -> Dict:
     return config
 
 
-def get_file_exclusions() -> List[str]:
+@functools.lru_cache(maxsize=1)
+def get_container_image_config() -> dict:
+    """
+    Get container image configuration from environment.
+
+    CONTAINER_IMAGE_URI is fixed for the lifetime of the process, so the
+    parsed result is cached. Treat the returned dict as read-only.
+
+    Returns:
+        {
+            "uri": "ghcr.io/user/image@sha256:...",  # Full URI with digest
+            "registry_path": "ghcr.io/user/image",     # Without digest
+            "digest": "sha256:...",                     # Just the digest
+            "use_container": bool                       # Whether to use containers
+        }
+    """
+    image_uri = os.getenv("CONTAINER_IMAGE_URI", "")
+
+    # Container mode is enabled if image URI is configured
+    use_container = bool(image_uri)
+
+    # Parse digest from URI if present (format: image@sha256:...)
+    registry_path = ""
+    digest = ""
+    if image_uri and "@" in image_uri:
+        registry_path, digest = image_uri.split("@", 1)
+    elif image_uri:
+        registry_path = image_uri
+
+    return {
+        "uri": image_uri,
+        "registry_path": registry_path,
+        "digest": digest,
+        "use_container": use_container
+    }
+
+
+def get_file_exclusions() -> FrozenSet[str]:
     """
-    Get list of file patterns to exclude from upload.
+    Get file patterns to exclude from upload.
 
     Returns:
-        List of file extensions and directory names to exclude
+        Frozenset of file extensions and directory names to exclude
     """
-    return DEFAULT_CONFIG["file_exclusions"]
+    return FILE_EXCLUSIONS
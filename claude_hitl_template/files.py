@@ -5,64 +5,181 @@ to Kodosumi's /out directory for user download.
 """
 
 import os
-from pathlib import Path
-from typing import List
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Collection, Dict, FrozenSet, List, Optional, Tuple
 import logging
 from kodosumi.core import Tracer
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of files uploaded concurrently
+UPLOAD_CONCURRENCY = 8
 
-async def scan_generated_files(exclusions: List[str]) -> List[str]:
+# Copy buffer per upload (1 MiB)
+UPLOAD_CHUNK_BYTES = 1 << 20
+
+# Project files that are never uploaded, regardless of exclusions
+_SPECIAL_FILENAMES = frozenset({'Dockerfile', 'pyproject.toml', 'README.md'})
+
+
+async def scan_generated_files(exclusions: Collection[str]) -> List[str]:
     """
     Scan working directory for files likely generated during execution.
 
+    Collects iter_generated_files() into a list.
+
     Args:
-        exclusions: List of patterns to exclude (extensions, directory names)
+        exclusions: Patterns to exclude (extensions, directory names)
 
     Returns:
         List of absolute file paths to generated files
     """
-    cwd = Path.cwd()
-    generated = []
+    return [file_path async for file_path in iter_generated_files(exclusions)]
+
+
+async def iter_generated_files(exclusions: Collection[str]) -> AsyncIterator[str]:
+    """
+    Yield files likely generated during execution as the scan finds them.
+
+    Walks the tree with os.scandir and prunes excluded and hidden
+    directories (.git, venv, __pycache__, ...) without descending into them.
+    Each top-level subdirectory is walked in its own worker thread, so the
+    scan runs in parallel and never blocks the event loop. Files are yielded
+    per finished subdirectory, so consumers can start on them early.
+
+    Args:
+        exclusions: Patterns to exclude (extensions, directory names)
+
+    Yields:
+        Absolute file paths to generated files
+    """
+    cwd = os.getcwd()
+    rules = _exclusion_rules(exclusions)
 
     logger.info(f"Scanning {cwd} for generated files...")
 
-    # Recursively find all files
-    for path in cwd.rglob("*"):
-        if path.is_file() and not _should_exclude(path, exclusions):
-            generated.append(str(path.absolute()))
-            logger.debug(f"Found generated file: {path.name}")
+    # Top-level files inline, one shard per top-level subdirectory
+    generated, shards = await asyncio.to_thread(_scan_dir, cwd, rules)
+    found = len(generated)
+    for file_path in generated:
+        yield file_path
+
+    semaphore = asyncio.Semaphore(os.cpu_count() or 4)
+
+    async def walk_shard(root: str) -> List[str]:
+        async with semaphore:
+            return await asyncio.to_thread(_walk_sync, root, rules)
 
-    logger.info(f"Found {len(generated)} generated files")
+    tasks = [asyncio.create_task(walk_shard(root)) for root in shards]
+    try:
+        for next_shard in asyncio.as_completed(tasks):
+            shard_files = await next_shard
+            found += len(shard_files)
+            for file_path in shard_files:
+                yield file_path
+    finally:
+        # Consumer stopped early: don't leave shard walks running
+        for task in tasks:
+            task.cancel()
+
+    logger.info(f"Found {found} generated files")
+
+
+def _walk_sync(root: str, rules: Tuple[FrozenSet[str], FrozenSet[str]]) -> List[str]:
+    """
+    Depth-first walk of root, pruning excluded directories (blocking).
+
+    Args:
+        root: Directory to walk
+        rules: (names, extensions) from _exclusion_rules()
+
+    Returns:
+        Absolute paths of files that aren't excluded
+    """
+    generated = []
+    stack = [root]
+    while stack:
+        files, subdirs = _scan_dir(stack.pop(), rules)
+        generated.extend(files)
+        stack.extend(subdirs)
     return generated
 
 
-def _should_exclude(path: Path, exclusions: List[str]) -> bool:
+def _scan_dir(
+    directory: str,
+    rules: Tuple[FrozenSet[str], FrozenSet[str]]
+) -> Tuple[List[str], List[str]]:
+    """
+    List one directory level with a single os.scandir pass.
+
+    DirEntry caches the file type, so there's no extra stat() per entry.
+
+    Args:
+        directory: Directory to list
+        rules: (names, extensions) from _exclusion_rules()
+
+    Returns:
+        (files to upload, subdirectories to descend into)
+    """
+    excluded_names = rules[0]
+    files = []
+    subdirs = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                name = entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    # Prune: never recurse into excluded or hidden directories
+                    if name not in excluded_names and not name.startswith('.'):
+                        subdirs.append(entry.path)
+                elif entry.is_file() and not _should_exclude(name, rules):
+                    files.append(entry.path)
+                    logger.debug(f"Found generated file: {name}")
+    except OSError as e:
+        logger.warning(f"Skipping unreadable directory: {e}")
+    return files, subdirs
+
+
+def _exclusion_rules(exclusions: Collection[str]) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+    """
+    Split exclusions once into (names, extensions) sets for _should_exclude().
+
+    Args:
+        exclusions: Patterns to exclude (extensions, directory names)
+
+    Returns:
+        (all patterns as exact names, dotted patterns as extensions)
+    """
+    names = frozenset(exclusions)
+    return names, frozenset(e for e in names if e.startswith('.'))
+
+
+def _should_exclude(name: str, rules: Tuple[FrozenSet[str], FrozenSet[str]]) -> bool:
     """
     Check if file should be excluded from upload.
 
+    Excluded directories are pruned by scan_generated_files(), so only the
+    file name itself needs checking: three O(1) set lookups.
+
     Args:
-        path: File path to check
-        exclusions: List of patterns to exclude
+        name: File name (no directory)
+        rules: (names, extensions) from _exclusion_rules()
 
     Returns:
         True if file should be excluded, False otherwise
     """
-    # Check if file is in excluded directory
-    for part in path.parts:
-        if part in exclusions or part.startswith('.'):
-            return True
+    excluded_names, excluded_exts = rules
 
-    # Check file extension
-    if path.suffix in exclusions:
+    # Check excluded and hidden names
+    if name in excluded_names or name.startswith('.'):
         return True
 
-    # Check specific filenames
-    if path.name in ['Dockerfile', 'pyproject.toml', 'README.md']:
+    # Check file extension
+    if os.path.splitext(name)[1] in excluded_exts:
         return True
 
-    return False
+    # Check specific filenames
+    return name in _SPECIAL_FILENAMES
 
 
 async def upload_files_to_kodosumi(
@@ -79,46 +196,197 @@ async def upload_files_to_kodosumi(
     Returns:
         List of successfully uploaded filenames
     """
+    # Uploads run concurrently, so each /out name must have a single writer
+    file_paths = _dedupe_destinations(file_paths)
+
     if not file_paths:
         logger.info("No files to upload")
         return []
 
     await tracer.markdown(f"📤 Uploading {len(file_paths)} generated files...")
 
-    # Get filesystem interface (sync version for Ray remote)
-    fs = tracer.fs_sync()
-    uploaded = []
-    errors = []
+    upload_one = _uploader(tracer)
+    results = await asyncio.gather(
+        *(upload_one(file_path) for file_path in file_paths),
+        return_exceptions=True
+    )
+    return await _report_uploads(tracer, file_paths, results)
+
+
+async def upload_generated_files(
+    tracer: Tracer,
+    exclusions: Collection[str]
+) -> List[str]:
+    """
+    Scan for generated files and upload them to Kodosumi /out as they're found.
+
+    Uploads start while the rest of the tree is still being scanned, so the
+    total time is roughly max(scan, upload) instead of scan + upload.
+
+    Args:
+        tracer: Kodosumi tracer instance
+        exclusions: Patterns to exclude (extensions, directory names)
+
+    Returns:
+        List of successfully uploaded filenames
+    """
+    upload_one = None
+    # /out name -> (rank, path, task) of the file that currently owns it
+    claims: Dict[str, Tuple[Tuple[int, str], str, asyncio.Task]] = {}
+    async for file_path in iter_generated_files(exclusions):
+        filename = os.path.basename(file_path)
+        rank = _destination_rank(file_path)
+        held = claims.get(filename)
+        if held is not None and held[0] <= rank:
+            logger.warning(f"Skipping {file_path}: {held[1]} is also named {filename}")
+            continue
+        if held is not None:
+            logger.warning(f"Skipping {held[1]}: {file_path} is also named {filename}")
+        if upload_one is None:
+            await tracer.markdown("📤 Uploading generated files...")
+            upload_one = _uploader(tracer)
+        # A better-ranked duplicate found later overwrites the earlier upload,
+        # but only once it has finished, so writes to one name never overlap
+        previous = held[2] if held is not None else None
+        claims[filename] = (rank, file_path, asyncio.create_task(_upload_after(previous, upload_one, file_path)))
+
+    if not claims:
+        logger.info("No files to upload")
+        return []
 
+    file_paths = [file_path for _, file_path, _ in claims.values()]
+    results = await asyncio.gather(*(task for _, _, task in claims.values()), return_exceptions=True)
+    return await _report_uploads(tracer, file_paths, results)
+
+
+async def _upload_after(
+    previous: Optional[asyncio.Task],
+    upload_one: Callable[[str], Awaitable[str]],
+    file_path: str
+) -> str:
+    """Upload file_path once the superseded upload to the same /out name is done."""
+    if previous is not None:
+        # The superseded file's outcome no longer matters, only that it stopped writing
+        await asyncio.gather(previous, return_exceptions=True)
+    return await upload_one(file_path)
+
+
+def _destination_rank(file_path: str) -> Tuple[int, str]:
+    """
+    Sort key deciding which file owns a contested /out name (lower wins).
+
+    Files are uploaded flat into /out by basename. When several generated
+    files share a basename, the shallowest one wins, and among equally deep
+    files the lexicographically smallest path. The rule depends only on the
+    paths, never on the order the parallel scan finds them.
+    """
+    return file_path.count(os.sep), file_path
+
+
+def _dedupe_destinations(file_paths: List[str]) -> List[str]:
+    """
+    Keep one file per /out name, chosen by _destination_rank().
+
+    Args:
+        file_paths: Candidate files
+
+    Returns:
+        One file per name, in order of each name's first appearance
+    """
+    winners: Dict[str, str] = {}
     for file_path in file_paths:
         filename = os.path.basename(file_path)
-        dest_path = f"/out/{filename}"
+        held = winners.get(filename)
+        if held is None or _destination_rank(file_path) < _destination_rank(held):
+            winners[filename] = file_path
+
+    for file_path in file_paths:
+        winner = winners[os.path.basename(file_path)]
+        if file_path != winner:
+            logger.warning(f"Skipping {file_path}: {winner} is also named {os.path.basename(file_path)}")
+    return list(winners.values())
+
+
+def _uploader(tracer: Tracer) -> Callable[[str], Awaitable[str]]:
+    """
+    Build a coroutine function that uploads one file, UPLOAD_CONCURRENCY at a time.
+
+    Args:
+        tracer: Kodosumi tracer instance
+
+    Returns:
+        Async callable taking a file path and returning the uploaded filename
+    """
+    # Get filesystem interface (sync version for Ray remote)
+    fs = tracer.fs_sync()
+    semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
 
-        try:
-            logger.info(f"Uploading {filename} to {dest_path}")
+    async def upload_one(file_path: str) -> str:
+        # Blocking read/write runs in a worker thread; the semaphore bounds
+        # how many uploads are in flight at once
+        async with semaphore:
+            return await asyncio.to_thread(_upload_file, fs, file_path)
 
-            # Read file content
-            with open(file_path, 'rb') as f:
-                content = f.read()
+    return upload_one
 
-            # Upload to Kodosumi
-            with fs.open(dest_path, 'wb') as out_f:
-                out_f.write(content)
 
-            uploaded.append(filename)
-            logger.info(f"✓ Uploaded {filename}")
+async def _report_uploads(tracer: Tracer, file_paths: List[str], results: List[Any]) -> List[str]:
+    """
+    Log upload outcomes and report them in a single tracer call.
 
-        except Exception as e:
-            error_msg = f"Failed to upload {filename}: {str(e)}"
+    Args:
+        tracer: Kodosumi tracer instance
+        file_paths: Files that were uploaded
+        results: Uploaded filename or exception per file, in the same order
+
+    Returns:
+        List of successfully uploaded filenames
+    """
+    uploaded = []
+    errors = []
+    for file_path, result in zip(file_paths, results):
+        if isinstance(result, Exception):
+            error_msg = f"Failed to upload {os.path.basename(file_path)}: {str(result)}"
             logger.error(error_msg)
             errors.append(error_msg)
-            await tracer.markdown(f"⚠️ {error_msg}")
+        else:
+            uploaded.append(result)
 
-    # Report results
-    if uploaded:
-        await tracer.markdown(f"✓ Successfully uploaded {len(uploaded)} files")
+    logger.info(f"Uploaded {len(uploaded)}/{len(file_paths)} files to /out")
 
+    # Report results in a single tracer call
+    report = []
+    if uploaded:
+        report.append(f"✓ Successfully uploaded {len(uploaded)} files")
     if errors:
-        await tracer.markdown(f"⚠️ {len(errors)} upload(s) failed")
+        report.append(f"⚠️ {len(errors)} upload(s) failed:")
+        report.extend(f"- {error_msg}" for error_msg in errors)
+    if report:
+        await tracer.markdown("\n".join(report))
 
     return uploaded
+
+
+def _upload_file(fs, file_path: str) -> str:
+    """
+    Copy one file to Kodosumi /out (blocking; run in a worker thread).
+
+    Args:
+        fs: Kodosumi sync filesystem from tracer.fs_sync()
+        file_path: Absolute path of the file to upload
+
+    Returns:
+        Uploaded filename
+    """
+    filename = os.path.basename(file_path)
+    dest_path = f"/out/{filename}"
+
+    logger.debug(f"Uploading {filename} to {dest_path}")
+
+    # Stream to Kodosumi in chunks: at most UPLOAD_CHUNK_BYTES resident per upload
+    with open(file_path, 'rb') as src, fs.open(dest_path, 'wb') as dst:
+        while chunk := src.read(UPLOAD_CHUNK_BYTES):
+            dst.write(chunk)
+
+    logger.debug(f"✓ Uploaded {filename}")
+    return filename
@@ -0,0 +1,77 @@
+"""Build-time plugin manifest generation.
+
+Plugins are baked into the container image, so their capabilities
+(commands, agents, skills, MCP servers) never change at runtime. This
+module enumerates them once during the image build and writes
+/app/plugins/manifest.json, which resolve_plugin_paths() reads instead
+of scanning plugin directories in every actor.
+
+Usage (see Dockerfile):
+    python -m claude_hitl_template.plugin_manifest [plugins_root]
+"""
+
+import os
+import sys
+import json
+import logging
+from typing import Dict
+
+from .agent import PLUGINS_ROOT, _scan_plugin_capabilities
+
+logger = logging.getLogger(__name__)
+
+
+def build_plugin_manifest(plugins_root: str = PLUGINS_ROOT) -> Dict[str, Dict]:
+    """
+    Enumerate every plugin under {plugins_root}/{marketplace}/plugins/{plugin}/.
+
+    Args:
+        plugins_root: Directory containing the baked marketplaces
+
+    Returns:
+        {"plugin@marketplace": plugin info} for all baked plugins
+    """
+    manifest = {}
+
+    with os.scandir(plugins_root) as marketplaces:
+        for marketplace in marketplaces:
+            if not marketplace.is_dir():
+                continue
+
+            plugins_dir = os.path.join(marketplace.path, "plugins")
+            try:
+                with os.scandir(plugins_dir) as plugins:
+                    for plugin in plugins:
+                        if plugin.name.startswith(".") or not plugin.is_dir():
+                            continue
+                        # Runtime resolves plugins to this exact path format
+                        plugin_path = f"{plugins_root}/{marketplace.name}/plugins/{plugin.name}"
+                        manifest[f"{plugin.name}@{marketplace.name}"] = _scan_plugin_capabilities(
+                            plugin_path, plugin.name, marketplace.name
+                        )
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+
+    return manifest
+
+
+def main(argv=None) -> int:
+    """Write manifest.json into the plugins root."""
+    args = sys.argv[1:] if argv is None else argv
+    plugins_root = args[0] if args else PLUGINS_ROOT
+
+    if not os.path.isdir(plugins_root):
+        print(f"No plugins directory at {plugins_root}, skipping manifest")
+        return 0
+
+    manifest = build_plugin_manifest(plugins_root)
+    manifest_path = os.path.join(plugins_root, "manifest.json")
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    print(f"Wrote {len(manifest)} plugins to {manifest_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,28 +9,159 @@ This module handles Kodosumi integration only:
 
 All Claude SDK logic is in agent.py (ClaudeSessionActor).
 """
+import io
 import os
-import uuid
+import json
+import time
+import asyncio
+import socket
+import itertools
+import hashlib
+import logging
+import functools
+from collections import deque
 import ray
 import fastapi
 from kodosumi.core import Launch, ServeAPI, InputsError, Tracer
 from kodosumi.core import forms as F
 from kodosumi import dtypes
 from ray import serve
-from datetime import datetime
-from .agent import create_actor, get_actor, cleanup_actor, get_container_image_config
-from .config import load_kodosumi_config, get_file_exclusions
-from .files import scan_generated_files, upload_files_to_kodosumi
-from .results import build_final_result, build_conversation_summary
+from typing import Dict, Optional
+try:
+    import orjson  # Optional: faster JSON rendering
+except ImportError:
+    orjson = None
+# .agent (and with it claude_agent_sdk) is imported inside the functions that
+# drive actors, so Serve replicas that only render forms start faster
+from .config import load_kodosumi_config, get_file_exclusions, get_container_image_config
+from .files import upload_generated_files
+from .results import build_final_result, timestamp_now
+from .tracing import TracerBatcher
+
+logger = logging.getLogger(__name__)
 
 # Configuration
-CONVERSATION_TIMEOUT_SECONDS = 600  # 10 minutes
+CONVERSATION_TIMEOUT_SECONDS = 600  # 10 minutes per Claude turn (see _bounded_turn)
 MAX_MESSAGE_ITERATIONS = 50  # Safety limit to prevent infinite loops
+SESSION_IDLE_TIMEOUT_SECONDS = 660  # Matches ClaudeSession.timeout_seconds
+DISCONNECT_TIMEOUT_SECONDS = 30  # Bound on the session disconnect in run_conversation cleanup
+
+# Context messages rendered per batch
+CONTEXT_FLUSH_EVERY = 8
+
+# Per turn: context messages streamed live, then the most recent kept for the end
+CONTEXT_HEAD_MESSAGES = 32
+CONTEXT_TAIL_MESSAGES = 24
+
+# User responses that end the conversation
+_TERMINATION_WORDS = frozenset({"done", "exit", "quit", "stop"})
+_TERMINATION_MAX_LEN = max(map(len, _TERMINATION_WORDS))
+
+# Appended to the original prompt when reconnecting after a crash. Keeping the
+# prompt first (and this suffix constant) gives the reconnect the same prefix as
+# the first connect, so the API's prompt cache can serve it.
+_RECONNECT_SUFFIX = "\n\n(Continuing conversation: the previous session was interrupted, resume from the last user turn.)"
+
+# Reasons shown in the end-of-conversation summary
+_REASON_IDLE_TIMEOUT = "⏱️ Session timed out (11 minutes idle)"
+_REASON_CANCELLED = "⏹️ Conversation ended by user"
+_REASON_DONE = "✓ Conversation completed successfully"
+_REASON_EMPTY = "⚠️ Empty response - conversation ended"
+_REASON_MAX_ITERATIONS = f"⚠️ Maximum iteration limit reached ({MAX_MESSAGE_ITERATIONS})"
+_REASON_TURN_TIMEOUT = "⏱️ Claude response timed out (10 minutes)"
+_REASON_RETRIES_EXHAUSTED = "❌ Session failed after retries"
+_REASON_COMPLETED = "✓ Conversation completed"
+
+
+# Markdown shown when a conversation starts (see run_conversation)
+_INIT_TEMPLATE = """
+## Conversation Started
+**Timestamp:** {timestamp}
+**Execution ID:** {execution_id}
+
+{container_block}Initializing Claude Agent SDK...
+"""
+
+# Fixed parts of the lock form markdown (see claude_conversation_lock)
+_LOCK_MSG_FMT = {
+    "text": "{}\n\n".format,
+    "tool": "🔧 *{}*\n\n".format,
+}
+_LOCK_COMPLETE_HINT = "*Claude has finished responding. You can continue the conversation or type 'done' to end.*\n\n"
+_LOCK_FOOTER = """---
+
+### Continue the conversation
+
+Type your response to continue, or type **'done'** to end the conversation.
+"""
+
+# Markdown shown when a conversation ends (see _build_conversation_summary)
+_SUMMARY_TEMPLATE = """---
+
+## Conversation Complete
+
+**Status:** {reason}
+**Total Interactions:** {iterations}
+**Ended at:** {ended_at}
+
+---
+
+Thank you for using Claude HITL Template!
+"""
+
+# Execution IDs: host and pid fixed per replica, plus monotonic time and a counter
+_ID_PREFIX = f"{socket.gethostname()}-{os.getpid():x}"
+_id_counter = itertools.count()
+
+# Plugin capability keys and their labels, in display order
+_CAPABILITY_LABELS = (
+    ("commands", "Commands"),
+    ("agents", "Agents"),
+    ("skills", "Skills"),
+    ("mcp_servers", "MCP Servers"),
+)
+_BULLET = "  - "
+
+# Rendered metadata markdown keyed by _metadata_key(), oldest evicted first
+METADATA_CACHE_SIZE = 8
+_METADATA_MARKDOWN: Dict[str, str] = {}
+
+# Metadata markdown keyed by container image digest (skips get_metadata RPCs)
+IMAGE_METADATA_CACHE_SIZE = 32
+_METADATA_BY_IMAGE: Dict[str, str] = {}
+
+# Background actor teardowns started by _schedule_cleanup()
+_pending_cleanups: set = set()
+
+# Runtime configuration is read from the environment once per replica; the
+# returned dict is shared, so callers only read it
+_kodosumi_config = functools.lru_cache(maxsize=1)(load_kodosumi_config)
 
 # Create ServeAPI instance
 app = ServeAPI()
 
 
+# Dependency suggestion lines: one per missing package, and per package type
+_PKG_LIST_TEMPLATE = "- **{name}** ({type}): {purpose}"
+_PKG_TEMPLATES = {
+    "python": "   - Add `{name}` to `dependencies/requirements.txt`",
+    "nodejs": "   - Add `\"{name}\": \"^X.Y.Z\"` to `dependencies/package.json`",
+    "system": "   - Add `{name}` to `dependencies/system-packages.txt`",
+}
+
+
+# Fixed elements of the dependency workaround form; only the question varies
+_WORKAROUND_CHOICE = F.Radio(
+    label="Your choice",
+    name="proceed",
+    options=[
+        {"label": "Yes, use workaround", "value": "yes"},
+        {"label": "No, I'll add dependencies first", "value": "no"}
+    ]
+)
+_WORKAROUND_SUBMIT = F.Submit("Continue")
+
+
 # Helper function for dependency suggestions
 async def send_dependency_suggestion(
     tracer: Tracer,
@@ -78,22 +209,14 @@ async def send_dependency_suggestion(
             return
     """
     # Build package list
-    pkg_list = "\n".join([
-        f"- **{pkg['name']}** ({pkg['type']}): {pkg['purpose']}"
-        for pkg in missing_packages
-    ])
-
-    # Create dependency addition instructions
-    instructions = []
-    for pkg in missing_packages:
-        if pkg['type'] == 'python':
-            instructions.append(f"   - Add `{pkg['name']}` to `dependencies/requirements.txt`")
-        elif pkg['type'] == 'nodejs':
-            instructions.append(f"   - Add `\"{pkg['name']}\": \"^X.Y.Z\"` to `dependencies/package.json`")
-        elif pkg['type'] == 'system':
-            instructions.append(f"   - Add `{pkg['name']}` to `dependencies/system-packages.txt`")
+    pkg_list = "\n".join(_PKG_LIST_TEMPLATE.format_map(pkg) for pkg in missing_packages)
 
-    instruction_text = "\n".join(instructions)
+    # Create dependency addition instructions (unknown package types are skipped)
+    instruction_text = "\n".join(
+        _PKG_TEMPLATES[pkg['type']].format(name=pkg['name'])
+        for pkg in missing_packages
+        if pkg['type'] in _PKG_TEMPLATES
+    )
 
     message = f"""
 ## ⚠️ Dependency Limitation
@@ -124,15 +247,8 @@ async def send_dependency_suggestion(
             "dependency-workaround-approval",
             F.Model(
                 F.Markdown(f"### Proceed with {current_approach}?"),
-                F.Radio(
-                    label="Your choice",
-                    name="proceed",
-                    options=[
-                        {"label": "Yes, use workaround", "value": "yes"},
-                        {"label": "No, I'll add dependencies first", "value": "no"}
-                    ]
-                ),
-                F.Submit("Continue")
+                _WORKAROUND_CHOICE,
+                _WORKAROUND_SUBMIT
             )
         )
         return response
@@ -166,6 +282,18 @@ prompt_form = F.Model(
 )
 
 
+# Fixed elements of the lock form, built once like prompt_form; only the
+# markdown with Claude's messages changes per lock
+_LOCK_INPUT_AREA = F.InputArea(
+    label="Your Response",
+    name="response",
+    placeholder="Type your response or 'done' to finish...",
+    required=False,
+    rows=3
+)
+_LOCK_SUBMIT = F.Submit("Send")
+
+
 @app.lock("claude-input")
 async def claude_conversation_lock(data: dict):
     """
@@ -181,39 +309,36 @@ async def claude_conversation_lock(data: dict):
     Returns:
         Form model with Claude's messages and user input field
     """
-    # Extract data
-    messages = data.get("messages", [])
-    status = data.get("status", "ready")
-    iteration = data.get("iteration", 0)
+    content = _format_lock_messages(data.get("messages", []), data.get("status", "ready"))
+    return F.Model(F.Markdown(content), _LOCK_INPUT_AREA, _LOCK_SUBMIT)
+
 
-    # Build markdown content with Claude's messages
-    content = "## Claude's Response\n\n"
+def _format_lock_messages(messages: list, status: str) -> str:
+    """
+    Render the lock form markdown for Claude's messages (pure; no I/O).
 
+    Args:
+        messages: User-facing message dicts ("text" or "tool")
+        status: "ready" or "complete"
+
+    Returns:
+        Markdown with Claude's response, status hint and instructions
+    """
+    # Build markdown content with Claude's messages (unknown types are skipped)
+    parts = ["## Claude's Response\n\n"]
     for msg in messages:
-        if msg["type"] == "text":
-            content += f"{msg['content']}\n\n"
-        elif msg["type"] == "tool":
-            content += f"🔧 *{msg['content']}*\n\n"
+        fmt = _LOCK_MSG_FMT.get(msg["type"])
+        if fmt is not None:
+            parts.append(fmt(msg["content"]))
 
     # Add status indicator if task is complete
     if status == "complete":
-        content += "*Claude has finished responding. You can continue the conversation or type 'done' to end.*\n\n"
+        parts.append(_LOCK_COMPLETE_HINT)
 
     # Add instructions
-    content += "---\n\n### Continue the conversation\n\n"
-    content += "Type your response to continue, or type **'done'** to end the conversation.\n"
-
-    return F.Model(
-        F.Markdown(content),
-        F.InputArea(
-            label="Your Response",
-            name="response",
-            placeholder="Type your response or 'done' to finish...",
-            required=False,
-            rows=3
-        ),
-        F.Submit("Send")
-    )
+    parts.append(_LOCK_FOOTER)
+
+    return "".join(parts)
 
 
 @app.lease("claude-input")
@@ -273,10 +398,20 @@ async def enter(request: fastapi.Request, inputs: dict):
     # imports the module in execution context, registering lock/lease handlers
     return Launch(request, "claude_hitl_template.query:run_conversation", inputs={
         "prompt": prompt,
-        "timestamp": datetime.now().isoformat()
+        "timestamp": timestamp_now()
     })
 
 
+def _new_execution_id() -> str:
+    """
+    Generate a unique execution ID without urandom or UUID formatting.
+
+    Unique across replicas (hostname + pid) and within a process
+    (monotonic nanoseconds + counter).
+    """
+    return f"{_ID_PREFIX}-{time.monotonic_ns():x}-{next(_id_counter):x}"
+
+
 async def run_conversation(inputs: dict, tracer: Tracer):
     """
     Orchestrate Claude conversation with HITL using Ray Actor.
@@ -292,56 +427,40 @@ async def run_conversation(inputs: dict, tracer: Tracer):
         inputs: Execution inputs including initial prompt
         tracer: Kodosumi tracer for progress updates and HITL
     """
+    from .agent import create_actor, aget_actor, cleanup_actor, SessionNotConnectedError
+
     # Load configuration for completion behavior
-    config = load_kodosumi_config()
+    config = _kodosumi_config()
+    auto_complete = config.get("completion_mode") == "auto-complete"
 
     # Generate unique execution ID
-    execution_id = inputs.get("execution_id", str(uuid.uuid4()))
+    execution_id = inputs.get("execution_id")
+    if execution_id is None:
+        execution_id = _new_execution_id()
     prompt = inputs["prompt"]
 
-    # Get container image configuration for visibility
-    image_config = get_container_image_config()
-
-    # Build initialization message with image info
-    init_message = f"""
-## Conversation Started
-**Timestamp:** {inputs["timestamp"]}
-**Execution ID:** {execution_id}
-
-"""
-
-    # Add container image info if using containers
-    if image_config["use_container"]:
-        # Truncate digest for readability (first 12 + last 6 chars)
-        digest = image_config["digest"]
-        if digest and len(digest) > 25:
-            digest_display = f"{digest[:19]}...{digest[-6:]}"
-        else:
-            digest_display = digest or "unknown"
-
-        init_message += f"""### Container Image Configuration
-**Registry Path:** `{image_config["registry_path"]}`
-**Digest:** `{digest_display}` (SHA256)
-
-This conversation will run in a containerized Ray Actor with baked `.claude` configurations.
-
-"""
-
-    init_message += "Initializing Claude Agent SDK...\n"
+    # Build initialization message; the container block is formatted once per replica
+    init_message = _INIT_TEMPLATE.format(
+        timestamp=inputs["timestamp"],
+        execution_id=execution_id,
+        container_block=_container_block()
+    )
 
-    # Show initial status
-    await tracer.markdown(init_message)
+    # Startup status is batched; it is flushed before each long wait
+    status = TracerBatcher(tracer)
+    await status.markdown(init_message)
 
     retry_count = 0
     max_retries = 1
+    iteration = 0
 
     try:
         while retry_count <= max_retries:
             try:
                 # Get or create actor
-                actor = get_actor(execution_id)
+                actor = await aget_actor(execution_id)
                 if actor is None:
-                    await tracer.markdown("Creating Ray Actor for persistent session...")
+                    await status.markdown("Creating Ray Actor for persistent session...")
                     # Pass current working directory to actor
                     # (Ray worker's cwd may differ from orchestration process)
                     actor = create_actor(execution_id, cwd=os.getcwd())
@@ -352,50 +471,66 @@ This conversation will run in a containerized Ray Actor with baked `.claude` con
 
                 # Connect or reconnect
                 if is_first_connect:
-                    await tracer.markdown("✓ Actor created\n\nConnecting to Claude...")
-                    result = await actor.connect.remote(prompt)
+                    await status.markdown("✓ Actor created\n\nConnecting to Claude...")
+                    # Send the status while the connect is in flight
+                    sent = asyncio.create_task(status.flush())
+                    # Fetch metadata while the connect turn streams; both are
+                    # independent calls on the async actor. Containerized
+                    # metadata is fixed per image digest, so a cached copy
+                    # skips the RPC entirely.
+                    image_digest = _image_digest()
+                    metadata_markdown = _METADATA_BY_IMAGE.get(image_digest) if image_digest else None
+                    if metadata_markdown is None:
+                        metadata_ref = actor.get_metadata.remote()
+                    result = await _turn_with(sent, _bounded_turn(tracer, actor.connect_stream.remote(prompt)))
                 else:
                     # Reconnect after retry
-                    await tracer.markdown("🔄 Reconnecting to Claude...")
-                    result = await actor.connect.remote(f"Continuing conversation: {prompt}")
+                    await status.markdown("🔄 Reconnecting to Claude...")
+                    sent = asyncio.create_task(status.flush())
+                    result = await _turn_with(sent, _bounded_turn(
+                        tracer, actor.connect_stream.remote(prompt + _RECONNECT_SUFFIX)
+                    ))
+
+                # The actor's idle clock restarts when a turn ends; mirror it
+                last_activity = time.monotonic()
 
-                await tracer.markdown("✓ Connected\n")
+                await status.markdown("✓ Connected\n")
 
                 # Get and display agent metadata
                 if is_first_connect:
-                    await tracer.markdown("Loading agent configuration...")
-                    metadata = await actor.get_metadata.remote()
-                    formatted_metadata = _format_metadata(metadata)
-                    await tracer.markdown(formatted_metadata)
+                    await status.markdown("Loading agent configuration...")
+                    if metadata_markdown is None:
+                        metadata_markdown = _format_metadata(await metadata_ref)
+                        if image_digest:
+                            _remember_image_metadata(image_digest, metadata_markdown)
+                    await status.markdown(metadata_markdown)
+
+                # Flush before the first lock or finalize so output stays ordered
+                await status.flush()
 
                 # Check for autonomous completion on initial connection (ResultMessage received)
-                if result["status"] == "complete" and config.get("completion_mode") == "auto-complete":
+                if auto_complete and result["status"] == "complete":
                     completion_type = result.get("completion_type", "unknown")
                     await tracer.markdown(f"\n✓ **Task complete** (via {completion_type}) - Finalizing job...")
                     final_result = await _finalize_job(
                         tracer=tracer,
                         messages=result.get("user_messages", []),
                         iteration=1,
-                        config=config
+                        config=config,
+                        execution_id=execution_id
                     )
                     return dtypes.Markdown(body=final_result)
 
-                # Main conversation loop
+                # Main conversation loop; bound methods are looked up once
+                lock = tracer.lock
+                markdown = tracer.markdown
+                query_stream = actor.query_stream.remote
                 iteration = 0
                 while iteration < MAX_MESSAGE_ITERATIONS:
                     iteration += 1
 
-                    # Check timeout
-                    is_timeout = await actor.check_timeout.remote()
-                    if is_timeout:
-                        summary = _build_conversation_summary(iteration, "⏱️ Session timed out (11 minutes idle)")
-                        return dtypes.Markdown(body=summary)
-
-                    # Display context messages in admin panel (thinking, tool results, etc.)
-                    await _display_context_messages(tracer, result.get("context_messages", []))
-
                     # HITL pause - Pass only user-facing messages to lock handler
-                    user_input = await tracer.lock(
+                    user_input = await lock(
                         "claude-input",
                         {
                             "iteration": iteration,
@@ -406,49 +541,64 @@ This conversation will run in a containerized Ray Actor with baked `.claude` con
 
                     # Check for cancellation
                     if not user_input or user_input.get("cancelled"):
-                        summary = _build_conversation_summary(iteration, "⏹️ Conversation ended by user")
-                        return dtypes.Markdown(body=summary)
+                        return _end(iteration, _REASON_CANCELLED)
 
                     response_text = user_input.get("response", "").strip()
 
                     # Check for termination keywords
-                    if response_text.lower() in ["done", "exit", "quit", "stop"]:
-                        summary = _build_conversation_summary(iteration, "✓ Conversation completed successfully")
-                        return dtypes.Markdown(body=summary)
+                    if len(response_text) <= _TERMINATION_MAX_LEN and response_text.casefold() in _TERMINATION_WORDS:
+                        return _end(iteration, _REASON_DONE)
 
                     if not response_text:
-                        summary = _build_conversation_summary(iteration, "⚠️ Empty response - conversation ended")
-                        return dtypes.Markdown(body=summary)
+                        return _end(iteration, _REASON_EMPTY)
+
+                    # The lock wait is the idle period. last_activity mirrors the
+                    # actor's idle clock, so this needs no check_timeout RPC; past
+                    # the deadline the actor has already disconnected itself
+                    if time.monotonic() - last_activity > SESSION_IDLE_TIMEOUT_SECONDS:
+                        return _end(iteration, _REASON_IDLE_TIMEOUT)
 
-                    # Send to Claude
-                    await tracer.markdown(f"\n**You:** {response_text}\n\n*Waiting for Claude's response...*\n")
-                    result = await actor.query.remote(response_text)
+                    # Send to Claude; echo the user's reply while the query is in flight
+                    echo = asyncio.create_task(
+                        markdown(f"\n**You:** {response_text}\n\n*Waiting for Claude's response...*\n")
+                    )
+                    result = await _turn_with(echo, _bounded_turn(tracer, query_stream(response_text)))
+                    last_activity = time.monotonic()
 
                     # Check for autonomous completion after query
-                    if result["status"] == "complete" and config.get("completion_mode") == "auto-complete":
+                    if auto_complete and result["status"] == "complete":
                         completion_type = result.get("completion_type", "unknown")
                         await tracer.markdown(f"\n✓ **Task complete** (via {completion_type}) - Finalizing job...")
                         final_result = await _finalize_job(
                             tracer=tracer,
                             messages=result.get("user_messages", []),
                             iteration=iteration,
-                            config=config
+                            config=config,
+                            execution_id=execution_id
                         )
                         return dtypes.Markdown(body=final_result)
 
                 # Max iterations check
                 if iteration >= MAX_MESSAGE_ITERATIONS:
-                    summary = _build_conversation_summary(iteration, f"⚠️ Maximum iteration limit reached ({MAX_MESSAGE_ITERATIONS})")
-                    return dtypes.Markdown(body=summary)
+                    return _end(iteration, _REASON_MAX_ITERATIONS)
 
                 # Success - exit retry loop (this should be unreachable now)
                 break
 
+            except asyncio.TimeoutError:
+                # A Claude turn overran its deadline; finally cleans up the actor
+                return _end(iteration, _REASON_TURN_TIMEOUT)
+
+            except SessionNotConnectedError:
+                # The actor disconnected itself after its idle deadline
+                return _end(iteration, _REASON_IDLE_TIMEOUT)
+
             except ray.exceptions.RayActorError as e:
                 # Actor crashed
                 retry_count += 1
                 if retry_count <= max_retries:
-                    await tracer.markdown(
+                    # Sent with the next startup batch (flushed before reconnecting)
+                    await status.markdown(
                         f"\n⚠️ **Session crashed. Retrying ({retry_count}/{max_retries})...**\n"
                     )
                     # Kill crashed actor (new one created in next iteration)
@@ -457,172 +607,527 @@ This conversation will run in a containerized Ray Actor with baked `.claude` con
                     except:
                         pass
                 else:
-                    summary = _build_conversation_summary(0, "❌ Session failed after retries")
-                    return dtypes.Markdown(body=summary)
+                    return _end(0, _REASON_RETRIES_EXHAUSTED)
 
         # If we reach here, conversation loop exited normally
         # This should not happen with current logic but handle it gracefully
-        summary = _build_conversation_summary(iteration, "✓ Conversation completed")
-        return dtypes.Markdown(body=summary)
+        return _end(iteration, _REASON_COMPLETED)
 
     except Exception as e:
         # Handle any errors with proper completion
-        summary = _build_conversation_summary(0, f"❌ Error: {str(e)[:100]}")
-        return dtypes.Markdown(body=summary)
+        return _end(0, f"❌ Error: {str(e)[:100]}")
 
     finally:
-        # Always cleanup actor
-        await cleanup_actor(execution_id)
+        # Always cleanup actor. The Claude CLI subprocess is stopped before
+        # returning; only the kill runs in the background, so the final
+        # markdown isn't held back by that round-trip
+        await _safe_disconnect(execution_id)
+        _schedule_cleanup(execution_id)
+        # Status left unsent by an early exit (e.g. actor creation failed)
+        try:
+            await status.flush()
+        except Exception as e:
+            logger.warning("Could not send pending status for %s: %s", execution_id, e)
+
+
+async def _safe_disconnect(execution_id: str):
+    """
+    Disconnect an execution's Claude session; errors are logged, never raised.
+
+    Runs before the background kill so the CLI subprocess is stopped even if
+    this process exits before _schedule_cleanup() finishes. Bounded by
+    DISCONNECT_TIMEOUT_SECONDS so a hung actor can't hold up the result.
+
+    Args:
+        execution_id: Conversation whose session should be disconnected
+    """
+    from .agent import aget_actor
+
+    try:
+        actor = await aget_actor(execution_id)
+        if actor is not None:
+            await asyncio.wait_for(actor.disconnect.remote(), timeout=DISCONNECT_TIMEOUT_SECONDS)
+    except Exception as e:
+        logger.warning("Disconnect failed for %s: %s", execution_id, e)
+
+
+def _schedule_cleanup(execution_id: str):
+    """
+    Kill an execution's actor in a background task.
+
+    The session was already disconnected by _safe_disconnect(), so only the
+    kill is left. The task is kept in _pending_cleanups until it finishes,
+    so it isn't garbage collected mid-flight.
+
+    Args:
+        execution_id: Conversation whose actor should be cleaned up
+    """
+    task = asyncio.create_task(_safe_cleanup(execution_id))
+    _pending_cleanups.add(task)
+    task.add_done_callback(_pending_cleanups.discard)
+
+
+async def _safe_cleanup(execution_id: str):
+    """cleanup_actor() for background use: errors are logged, never raised."""
+    from .agent import cleanup_actor
+
+    try:
+        await cleanup_actor(execution_id, disconnect=False)
+    except Exception as e:
+        logger.warning("Background cleanup failed for %s: %s", execution_id, e)
+
+
+async def _turn_with(side: asyncio.Task, turn) -> dict:
+    """
+    Await a turn, then the side task started alongside it (echo or status flush).
+
+    The side task is settled on every path, so its output lands before
+    whatever the caller reports next and its errors are never left
+    unretrieved. If the turn fails, a side-task error is only logged so it
+    doesn't mask the turn's exception; on cancellation the side task is
+    cancelled too.
+
+    Args:
+        side: Task started just before the turn
+        turn: Awaitable producing the turn result (usually _bounded_turn())
+
+    Returns:
+        The turn result
+    """
+    try:
+        result = await turn
+    except asyncio.CancelledError:
+        side.cancel()
+        raise
+    except Exception:
+        try:
+            await side
+        except Exception as e:
+            logger.warning("Tracer update alongside a failed turn also failed: %s", e)
+        raise
+    await side
+    return result
+
+
+async def _bounded_turn(tracer: Tracer, ref_generator) -> dict:
+    """
+    Run _stream_turn() against a local deadline of CONVERSATION_TIMEOUT_SECONDS.
+
+    The deadline is plain monotonic arithmetic in the orchestrator, so bounding
+    a turn costs no extra actor RPC.
+
+    Raises:
+        asyncio.TimeoutError: If the turn does not finish before the deadline
+    """
+    return await asyncio.wait_for(_stream_turn(tracer, ref_generator), timeout=CONVERSATION_TIMEOUT_SECONDS)
 
 
-async def _display_context_messages(tracer: Tracer, context_messages: list):
+async def _stream_turn(tracer: Tracer, ref_generator) -> dict:
     """
-    Display context messages (thinking, tool usage, results) in Kodosumi admin panel.
+    Consume one streamed Claude turn from the actor.
+
+    Context messages (thinking, tool usage, results) are shown in the admin
+    panel while the turn runs, in batches of CONTEXT_FLUSH_EVERY, instead of
+    after the whole turn; only the user-facing text messages are kept for
+    the HITL lock form.
+
+    Very verbose turns are capped: the first CONTEXT_HEAD_MESSAGES context
+    messages stream live, after which only the last CONTEXT_TAIL_MESSAGES are
+    kept (in a bounded deque) and shown at the end behind an elision marker.
 
-    These messages provide rich execution context that helps users understand
-    what Claude is doing internally, separate from the clean user-facing messages
-    shown in the HITL lock form.
+    Rendered batches go through a queue to a _drain_markdown() task, so the
+    stream keeps being consumed while a tracer call is in flight. The queue
+    is unbounded: the head cap limits a turn to
+    CONTEXT_HEAD_MESSAGES // CONTEXT_FLUSH_EVERY + 1 batches.
 
     Args:
         tracer: Kodosumi tracer for markdown output
+        ref_generator: ObjectRefGenerator from connect_stream/query_stream
+
+    Returns:
+        Result dict shaped like actor.query(): user_messages, context_messages
+        (always empty, already displayed), status and optional completion_type
+    """
+    from .agent import iter_stream
+
+    user_messages = []
+    pending = []
+    shown = 0
+    tail = deque(maxlen=CONTEXT_TAIL_MESSAGES)
+    elided = 0
+    status = {"status": "ready"}
+    queue = asyncio.Queue()
+    drain = asyncio.create_task(_drain_markdown(queue, tracer))
+    try:
+        async for record in iter_stream(ref_generator):
+            if "status" in record:
+                status = record
+                break
+            if record["type"] == "text":
+                user_messages.append(record)
+            elif shown < CONTEXT_HEAD_MESSAGES:
+                shown += 1
+                pending.append(record)
+                if len(pending) >= CONTEXT_FLUSH_EVERY:
+                    await _queue_context_messages(queue, pending)
+                    pending = []
+            else:
+                if len(tail) == CONTEXT_TAIL_MESSAGES:
+                    elided += 1
+                tail.append(record)
+
+        # Stream always ends with a status record; the default guards against
+        # early termination
+        if elided:
+            pending.append({"type": "elided", "count": elided})
+        pending.extend(tail)
+        await _queue_context_messages(queue, pending)
+        await queue.put(None)
+        await drain
+    finally:
+        drain.cancel()
+    return {"user_messages": user_messages, "context_messages": [], **status}
+
+
+async def _queue_context_messages(queue: asyncio.Queue, context_messages: list):
+    """Render a batch of context messages and queue it for _drain_markdown()."""
+    markdown = _format_context_messages(context_messages)
+    if markdown:
+        await queue.put(markdown)
+
+
+async def _drain_markdown(queue: asyncio.Queue, tracer: Tracer):
+    """
+    Send queued markdown to the tracer until a None sentinel arrives.
+
+    Everything already queued when a send starts is coalesced into that
+    send, so bursts cost one round-trip.
+
+    Args:
+        queue: Markdown strings from _queue_context_messages(), then None
+        tracer: Kodosumi tracer for markdown output
+    """
+    done = False
+    while not done:
+        item = await queue.get()
+        if item is None:
+            return
+        batch = [item]
+        while not queue.empty():
+            item = queue.get_nowait()
+            if item is None:
+                done = True
+                break
+            batch.append(item)
+        await tracer.markdown("\n".join(batch))
+
+
+def _format_context_messages(context_messages: list) -> str:
+    """
+    Render context messages (thinking, tool usage, results) as one markdown string.
+
+    These messages provide rich execution context in the Kodosumi admin panel,
+    separate from the clean user-facing messages shown in the HITL lock form.
+    Pure; no I/O.
+
+    Args:
         context_messages: List of context message dicts
+
+    Returns:
+        Markdown for all renderable messages ("" if there are none)
     """
-    if not context_messages:
-        return
+    renderers = _CONTEXT_RENDERERS
+    return "\n".join([
+        renderers[msg_type](msg)
+        for msg in context_messages
+        if (msg_type := msg.get("type")) in renderers
+    ])
 
-    for msg in context_messages:
-        msg_type = msg.get("type")
 
-        if msg_type == "thinking":
-            # Extended thinking/reasoning output
-            thinking_content = msg.get("content", "")
-            # Truncate very long thinking for readability
-            if len(thinking_content) > 500:
-                thinking_preview = thinking_content[:500] + "..."
-            else:
-                thinking_preview = thinking_content
-            await tracer.markdown(f"🧠 **Claude is thinking:**\n\n```\n{thinking_preview}\n```\n")
-
-        elif msg_type == "tool_use":
-            # Tool execution request
-            tool_name = msg.get("name", "unknown")
-            tool_input = msg.get("input", {})
-            await tracer.markdown(f"🔧 **Using tool: {tool_name}**\n\n```json\n{str(tool_input)[:200]}\n```\n")
-
-        elif msg_type == "tool_result":
-            # Tool execution result
-            content = msg.get("content", "")
-            is_error = msg.get("is_error", False)
-            emoji = "❌" if is_error else "✅"
-            status = "Error" if is_error else "Success"
-
-            # Truncate long results
-            content_str = str(content)
-            if len(content_str) > 300:
-                content_preview = content_str[:300] + "..."
-            else:
-                content_preview = content_str
+def _truncate(text: str, limit: int) -> str:
+    """Cut text to limit characters, marking the cut with "..."."""
+    return text[:limit] + "..." if len(text) > limit else text
+
+
+def _preview(value, limit: int) -> str:
+    """
+    Text of value, built only as far as needed to show limit characters.
+
+    str is returned as is; bytes are sliced before decoding; dicts and lists
+    are JSON-encoded incrementally and encoding stops once past the limit.
+    The result may be longer than limit, so callers still _truncate() it.
+
+    Args:
+        value: Content to preview
+        limit: Number of characters that will be shown
+
+    Returns:
+        Text with at least limit + 1 characters when value is longer than limit
+    """
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (bytes, bytearray)):
+        # UTF-8 needs at most 4 bytes per character
+        return bytes(value[:(limit + 1) * 4]).decode("utf-8", "replace")
+    if isinstance(value, (dict, list)):
+        chunks = []
+        size = 0
+        for chunk in _PREVIEW_ENCODER.iterencode(value):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size > limit:
+                break
+        return "".join(chunks)
+    return str(value)
+
+
+def _json_preview(value, limit: int) -> str:
+    """
+    JSON text of value, cut to limit characters.
+
+    Uses orjson when installed, the incremental encoder in _preview() otherwise.
+
+    Args:
+        value: JSON-like value (non-JSON leaves are rendered with str())
+        limit: Maximum characters shown
+
+    Returns:
+        JSON text, marked with "..." when cut
+    """
+    if orjson is not None:
+        try:
+            raw = orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+        else:
+            # UTF-8 needs at most 4 bytes per character
+            return _truncate(raw[:(limit + 1) * 4].decode("utf-8", "replace"), limit)
+    return _truncate(_preview(value, limit), limit)
+
+
+# Streaming encoder for _preview(); non-JSON values fall back to str()
+_PREVIEW_ENCODER = json.JSONEncoder(ensure_ascii=False, default=str)
 
-            await tracer.markdown(f"{emoji} **Tool result ({status}):**\n\n```\n{content_preview}\n```\n")
 
-        elif msg_type == "system":
-            # System messages
-            subtype = msg.get("subtype", "unknown")
-            data = msg.get("data", {})
-            await tracer.markdown(f"ℹ️ **System ({subtype}):** {str(data)[:200]}\n")
+def _render_thinking(msg: dict) -> str:
+    """Extended thinking/reasoning output."""
+    # Truncate very long thinking for readability
+    thinking_preview = _truncate(msg.get("content", ""), 500)
+    return f"🧠 **Claude is thinking:**\n\n```\n{thinking_preview}\n```\n"
+
+
+def _render_tool_use(msg: dict) -> str:
+    """Tool execution request."""
+    tool_name = msg.get("name", "unknown")
+    tool_input = msg.get("input", {})
+    return f"🔧 **Using tool: {tool_name}**\n\n```json\n{_json_preview(tool_input, 200)}\n```\n"
+
+
+# Tool result header (including the opening fence) by is_error
+_TOOL_RESULT_HEADERS = {
+    False: "✅ **Tool result (Success):**\n\n```\n",
+    True: "❌ **Tool result (Error):**\n\n```\n",
+}
+
+
+def _render_tool_result(msg: dict) -> str:
+    """Tool execution result."""
+    content = msg.get("content", "")
+
+    # Truncate long results without materialising the full payload
+    content_preview = _truncate(_preview(content, 300), 300)
+
+    return f"{_TOOL_RESULT_HEADERS[bool(msg.get('is_error', False))]}{content_preview}\n```\n"
+
+
+def _render_system(msg: dict) -> str:
+    """System messages."""
+    subtype = msg.get("subtype", "unknown")
+    data = msg.get("data", {})
+    return f"ℹ️ **System ({subtype}):** {_json_preview(data, 200)}\n"
+
+
+def _render_elided(msg: dict) -> str:
+    """Marker for context messages dropped from a verbose turn."""
+    return f"*… {msg['count']} messages elided …*\n"
+
+
+# Context message type -> markdown renderer (one dict lookup per message)
+_CONTEXT_RENDERERS = {
+    "thinking": _render_thinking,
+    "tool_use": _render_tool_use,
+    "tool_result": _render_tool_result,
+    "system": _render_system,
+    "elided": _render_elided,
+}
+
+
+@functools.lru_cache(maxsize=1)
+def _container_block() -> str:
+    """
+    Container image section of the init message ("" when not using containers).
+
+    The image config is fixed for the lifetime of the replica, so this is
+    formatted once and reused by every run_conversation() call.
+    """
+    image_config = get_container_image_config()
+    if not image_config["use_container"]:
+        return ""
+
+    return f"""### Container Image Configuration
+**Registry Path:** `{image_config["registry_path"]}`
+**Digest:** `{_digest_display(image_config["digest"])}` (SHA256)
+
+This conversation will run in a containerized Ray Actor with baked `.claude` configurations.
+
+"""
+
+
+@functools.lru_cache(maxsize=8)
+def _digest_display(digest: str) -> str:
+    """
+    Shorten an image digest for readability (algorithm prefix + head ... last 6 chars).
+
+    Cached: a replica only ever sees its own image digest.
+    """
+    if digest and len(digest) > 25:
+        return f"{digest[:19]}...{digest[-6:]}"
+    return digest or "unknown"
+
+
+def _image_digest() -> Optional[str]:
+    """Digest of the container image sessions run in (None when not pinned)."""
+    image_config = get_container_image_config()
+    if image_config["use_container"] and image_config["digest"]:
+        return image_config["digest"]
+    return None
+
+
+def _remember_image_metadata(digest: str, markdown: str):
+    """Cache metadata markdown for an image digest, evicting the oldest entry."""
+    if digest not in _METADATA_BY_IMAGE and len(_METADATA_BY_IMAGE) >= IMAGE_METADATA_CACHE_SIZE:
+        del _METADATA_BY_IMAGE[next(iter(_METADATA_BY_IMAGE))]
+    _METADATA_BY_IMAGE[digest] = markdown
+
+
+def _metadata_key(metadata: dict) -> str:
+    """
+    Fingerprint the parts of the metadata that _render_metadata() displays.
+
+    Args:
+        metadata: Metadata dict from actor.get_metadata()
+
+    Returns:
+        Hex digest identifying the rendered markdown
+    """
+    settings = metadata.get("settings", {})
+    shown = (
+        metadata.get("container", {}),
+        metadata.get("resources", {}),
+        metadata.get("plugins", []),
+        settings.get("permissions", []),
+        settings.get("sources", []),
+    )
+    payload = json.dumps(shown, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(payload, digest_size=16, usedforsecurity=False).hexdigest()
 
 
 def _format_metadata(metadata: dict) -> str:
     """
     Format agent metadata as readable markdown.
 
+    Metadata is fixed per image and plugin set, so the markdown is cached by
+    _metadata_key() and reused across executions.
+
     Args:
         metadata: Metadata dict from actor.get_metadata()
 
     Returns:
         Formatted markdown string
     """
-    lines = []
-    lines.append("## Agent Configuration\n")
+    key = _metadata_key(metadata)
+    markdown = _METADATA_MARKDOWN.get(key)
+    if markdown is None:
+        if len(_METADATA_MARKDOWN) >= METADATA_CACHE_SIZE:
+            # Evict the oldest entry (dicts keep insertion order)
+            del _METADATA_MARKDOWN[next(iter(_METADATA_MARKDOWN))]
+        markdown = _METADATA_MARKDOWN[key] = _render_metadata(metadata)
+    return markdown
+
+
+def _render_metadata(metadata: dict) -> str:
+    """Render agent metadata as markdown (uncached, see _format_metadata())."""
+    buf = io.StringIO()
+    w = buf.write
+    w("## Agent Configuration\n\n")
 
     # Container Configuration
     container = metadata.get("container", {})
     if container.get("use_container"):
-        lines.append("### Container Image")
-        lines.append(f"**Registry Path:** `{container.get('registry_path', 'unknown')}`")
+        w(f"""### Container Image
+**Registry Path:** `{container.get('registry_path', 'unknown')}`
+**Digest:** `{_digest_display(container.get('digest', ''))}` (SHA256)
 
-        # Truncate digest for readability
-        digest = container.get('digest', '')
-        if digest and len(digest) > 25:
-            digest_display = f"{digest[:19]}...{digest[-6:]}"
-        else:
-            digest_display = digest or "unknown"
-        lines.append(f"**Digest:** `{digest_display}` (SHA256)\n")
+""")
 
     # Resource Allocation
     resources = metadata.get("resources", {})
-    lines.append("### Resource Allocation")
-    lines.append(f"**CPUs:** {resources.get('cpus', 'unknown')}")
-    lines.append(f"**Memory:** {resources.get('memory_gb', 'unknown')} GB\n")
+    w(f"""### Resource Allocation
+**CPUs:** {resources.get('cpus', 'unknown')}
+**Memory:** {resources.get('memory_gb', 'unknown')} GB
+
+""")
 
     # Loaded Plugins and Capabilities
+    w("### Loaded Plugins\n\n")
     plugins = metadata.get("plugins", [])
     if plugins:
-        lines.append("### Loaded Plugins\n")
         for plugin in plugins:
-            plugin_name = plugin.get("name", "unknown")
-            marketplace = plugin.get("marketplace", "unknown")
-            lines.append(f"**{plugin_name}** (`{marketplace}`)")
+            w(f"**{plugin.get('name', 'unknown')}** (`{plugin.get('marketplace', 'unknown')}`)\n")
 
             # List capabilities
-            capabilities = []
-            if plugin.get("commands"):
-                capabilities.append(f"Commands: {', '.join(plugin['commands'])}")
-            if plugin.get("agents"):
-                capabilities.append(f"Agents: {', '.join(plugin['agents'])}")
-            if plugin.get("skills"):
-                capabilities.append(f"Skills: {', '.join(plugin['skills'])}")
-            if plugin.get("mcp_servers"):
-                capabilities.append(f"MCP Servers: {', '.join(plugin['mcp_servers'])}")
-
-            if capabilities:
-                for cap in capabilities:
-                    lines.append(f"  - {cap}")
-            else:
-                lines.append("  - No capabilities discovered")
-            lines.append("")
+            listed = False
+            for key, label in _CAPABILITY_LABELS:
+                names = plugin.get(key)
+                if names:
+                    w(f"{_BULLET}{label}: {', '.join(names)}\n")
+                    listed = True
+            if not listed:
+                w(f"{_BULLET}No capabilities discovered\n")
+            w("\n")
     else:
-        lines.append("### Loaded Plugins\n")
-        lines.append("*No plugins loaded*\n")
+        w("*No plugins loaded*\n\n")
 
     # Tool Permissions
     settings = metadata.get("settings", {})
     permissions = settings.get("permissions", [])
     if permissions:
-        lines.append("### Tool Permissions")
         # Group permissions by category for readability
-        lines.append(f"**Allowed Tools:** {len(permissions)} configured")
-        lines.append("<details><summary>View all permissions</summary>\n")
+        w(f"""### Tool Permissions
+**Allowed Tools:** {len(permissions)} configured
+<details><summary>View all permissions</summary>
+
+""")
         for perm in permissions:
-            lines.append(f"- `{perm}`")
-        lines.append("\n</details>\n")
+            w(f"- `{perm}`\n")
+        w("\n</details>\n\n")
 
     # Settings Resolution
     sources = settings.get("sources", [])
     if sources:
-        lines.append("### Settings Resolution")
-        lines.append(f"**Active Tiers:** {', '.join(sources)}\n")
+        w(f"### Settings Resolution\n**Active Tiers:** {', '.join(sources)}\n\n")
 
-    lines.append("---\n")
+    w("---\n")
 
-    return "\n".join(lines)
+    return buf.getvalue()
 
 
 async def _finalize_job(
     tracer: Tracer,
     messages: list,
     iteration: int,
-    config: dict
+    config: dict,
+    execution_id: Optional[str] = None
 ) -> str:
     """
     Finalize job completion: scan files, upload, and build final result.
@@ -632,6 +1137,7 @@ async def _finalize_job(
         messages: Claude's messages from this turn
         iteration: Current iteration count
         config: Configuration dict with upload_files setting
+        execution_id: Conversation ID (lets retries skip unchanged uploads)
 
     Returns:
         Formatted markdown result
@@ -640,11 +1146,8 @@ async def _finalize_job(
 
     # Handle file uploads if enabled
     if config.get("upload_files", True):
-        exclusions = get_file_exclusions()
-        file_paths = await scan_generated_files(exclusions)
-
-        if file_paths:
-            uploaded_files = await upload_files_to_kodosumi(tracer, file_paths)
+        # Uploads start while the scan is still walking the tree
+        uploaded_files = await upload_generated_files(tracer, get_file_exclusions())
 
     # Build final result
     return build_final_result(
@@ -655,29 +1158,36 @@ async def _finalize_job(
     )
 
 
-def _build_conversation_summary(iterations: int, reason: str) -> str:
+def _end(iterations: int, reason: str) -> dtypes.Markdown:
     """
-    Build a markdown summary of the conversation.
+    Final result for a conversation that ends without finalizing the job.
 
     Args:
         iterations: Number of conversation iterations
-        reason: Reason for conversation ending
+        reason: Reason for conversation ending (usually a _REASON_* constant)
 
     Returns:
-        Formatted markdown string
+        Markdown summary returned from run_conversation()
     """
-    return f"""---
+    return dtypes.Markdown(body=_build_conversation_summary(iterations, reason))
 
-## Conversation Complete
 
-**Status:** {reason}
-**Total Interactions:** {iterations}
-**Ended at:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+def _build_conversation_summary(iterations: int, reason: str) -> str:
+    """
+    Build a markdown summary of the conversation.
 
----
+    Args:
+        iterations: Number of conversation iterations
+        reason: Reason for conversation ending
 
-Thank you for using Claude HITL Template!
-"""
+    Returns:
+        Formatted markdown string
+    """
+    return _SUMMARY_TEMPLATE.format(
+        reason=reason,
+        iterations=iterations,
+        ended_at=timestamp_now()
+    )
 
 
 # Ray Serve deployment wrapper for Kodosumi ServeAPI
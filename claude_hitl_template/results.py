@@ -4,10 +4,24 @@ This module handles building the final markdown result that gets
 returned when a job completes.
 """
 
+import io
 from datetime import datetime
 from typing import List, Dict
 
 
+# Same marker as agent.COMPLETION_MARKER (not imported: agent pulls in Ray)
+COMPLETION_MARKER = "[TASK_COMPLETE]"
+
+
+def timestamp_now() -> str:
+    """
+    Current local time for display, as "YYYY-MM-DD HH:MM:SS".
+
+    Same output as strftime("%Y-%m-%d %H:%M:%S") via isoformat's C fast path.
+    """
+    return datetime.now().isoformat(sep=" ", timespec="seconds")
+
+
 def build_final_result(
     messages: List[Dict],
     files: List[str],
@@ -26,39 +40,41 @@ def build_final_result(
     Returns:
         Formatted markdown string
     """
-    lines = ["# Task Completed", ""]
+    completed_at = timestamp_now()
+    buf = io.StringIO()
+    w = buf.write
 
     # Add main content from Claude's messages
-    lines.append("## Result")
-    lines.append("")
+    w("# Task Completed\n\n## Result\n\n")
 
     for msg in messages:
         if msg.get("type") == "text":
             content = msg.get("content", "")
             if content:
-                # Strip completion marker from final output
-                content = content.replace("[TASK_COMPLETE]", "").strip()
+                # Strip completion marker from final output (replace only on a hit)
+                if COMPLETION_MARKER in content:
+                    content = content.replace(COMPLETION_MARKER, "")
+                content = content.strip()
                 if content:  # Only add if still has content after stripping
-                    lines.append(content)
-                    lines.append("")
+                    w(content)
+                    w("\n\n")
 
     # Add file download links if any
     if files:
-        lines.append("## Generated Files")
-        lines.append("")
+        w("## Generated Files\n\n")
         for filename in files:
             # Kodosumi file download URL pattern
-            lines.append(f"- 📄 [{filename}](/files/download/out/{filename})")
-        lines.append("")
+            w(f"- 📄 [{filename}](/files/download/out/{filename})\n")
+        w("\n")
 
     # Add metadata footer
-    lines.append("---")
-    lines.append("")
-    lines.append(f"**Status:** {reason}")
-    lines.append(f"**Conversation turns:** {iteration}")
-    lines.append(f"**Completed:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    w(f"""---
+
+**Status:** {reason}
+**Conversation turns:** {iteration}
+**Completed:** {completed_at}""")
 
-    return "\n".join(lines)
+    return buf.getvalue()
 
 
 def build_conversation_summary(
@@ -77,15 +93,14 @@ def build_conversation_summary(
     Returns:
         Formatted markdown string
     """
-    lines = ["# Conversation Ended", ""]
-    lines.append(f"**Reason:** {reason}")
-    lines.append(f"**Turns completed:** {iteration}")
-    lines.append("")
+    ended_at = timestamp_now()
+    buf = io.StringIO()
+    w = buf.write
+    w(f"# Conversation Ended\n\n**Reason:** {reason}\n**Turns completed:** {iteration}\n\n")
 
     # Include last few messages if provided
     if messages:
-        lines.append("## Last Messages")
-        lines.append("")
+        w("## Last Messages\n\n")
         # Show last 3 messages
         for msg in messages[-3:]:
             if msg.get("type") == "text":
@@ -94,10 +109,8 @@ def build_conversation_summary(
                     # Truncate long messages
                     if len(content) > 500:
                         content = content[:500] + "..."
-                    lines.append(f"> {content}")
-                    lines.append("")
+                    w(f"> {content}\n\n")
 
-    lines.append("---")
-    lines.append(f"**Timestamp:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    w(f"---\n**Timestamp:** {ended_at}")
 
-    return "\n".join(lines)
+    return buf.getvalue()
@@ -0,0 +1,90 @@
+"""Batched tracer output for Kodosumi integration.
+
+Every tracer.markdown() call is a round-trip to Kodosumi. This module
+buffers short status messages and sends them as one markdown block.
+"""
+
+import time
+from typing import List, Optional
+from kodosumi.core import Tracer
+
+# Flush once this many messages are buffered
+DEFAULT_MAX_BATCH = 8
+
+# Flush once the oldest buffered message is this old (milliseconds)
+DEFAULT_BATCH_INTERVAL_MS = 250
+
+# Age-triggered flushes wait until at least this much text is buffered
+DEFAULT_MIN_FLUSH_CHARS = 256
+
+
+class TracerBatcher:
+    """
+    Buffer tracer.markdown() payloads and emit them as a single call.
+
+    The buffer is flushed when max_batch messages are queued, when the
+    oldest queued message is older than batch_interval_ms and at least
+    min_flush_chars are buffered (checked on each add), on flush(), and
+    when leaving the async context. Short status lines therefore ride
+    along with the next substantive update. Callers must flush before
+    tracer.lock()/tracer.lease() so output stays ordered.
+
+    Args:
+        tracer: Kodosumi tracer to write to
+        max_batch: Maximum number of buffered messages
+        batch_interval_ms: Maximum age of the oldest buffered message
+        min_flush_chars: Minimum buffered text for an age-triggered flush
+    """
+
+    __slots__ = ("tracer", "max_batch", "batch_interval", "min_flush_chars", "_parts", "_chars", "_first_at")
+
+    def __init__(
+        self,
+        tracer: Tracer,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        batch_interval_ms: int = DEFAULT_BATCH_INTERVAL_MS,
+        min_flush_chars: int = DEFAULT_MIN_FLUSH_CHARS
+    ):
+        self.tracer = tracer
+        self.max_batch = max_batch
+        self.batch_interval = batch_interval_ms / 1000
+        self.min_flush_chars = min_flush_chars
+        self._parts: List[str] = []
+        self._chars = 0
+        self._first_at: Optional[float] = None
+
+    async def markdown(self, text: str):
+        """Queue a markdown message, flushing if the batch is full or stale."""
+        if not text:
+            return
+        now = time.monotonic()
+        if self._first_at is None:
+            self._first_at = now
+        self._parts.append(text)
+        self._chars += len(text)
+        if len(self._parts) >= self.max_batch:
+            await self.flush()
+        elif now - self._first_at >= self.batch_interval:
+            await self.flush(force=False)
+
+    async def flush(self, force: bool = True):
+        """
+        Send all buffered messages as one markdown block.
+
+        Args:
+            force: If False, keep buffering until min_flush_chars is reached
+        """
+        if not self._parts or (not force and self._chars < self.min_flush_chars):
+            return
+        # Separate messages by a blank line so each stays its own paragraph
+        body = "\n\n".join(self._parts)
+        self._parts = []
+        self._chars = 0
+        self._first_at = None
+        await self.tracer.markdown(body)
+
+    async def __aenter__(self) -> "TracerBatcher":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.flush()
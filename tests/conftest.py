@@ -0,0 +1,63 @@
+"""
+Shared pytest configuration.
+
+Tests marked `claude_env` talk to the real Claude SDK. When the Claude Code
+CLI or ANTHROPIC_API_KEY is missing they are skipped up front instead of
+each one waiting for the SDK to time out.
+"""
+import os
+import shutil
+import functools
+import subprocess
+from dataclasses import dataclass
+from typing import Optional
+
+import pytest
+
+
+@dataclass(frozen=True)
+class EnvInfo:
+    """System dependencies found on the test driver."""
+    node_path: Optional[str]
+    node_version: Optional[str]
+    claude_path: Optional[str]
+    api_key: Optional[str]
+
+
+def _version(executable: Optional[str]) -> Optional[str]:
+    """Return `<executable> --version` output, or None if it is missing or fails."""
+    if executable is None:
+        return None
+    try:
+        return subprocess.check_output([executable, "--version"], text=True, timeout=5).strip()
+    except (OSError, subprocess.CalledProcessError, subprocess.TimeoutExpired):
+        return None
+
+
+@functools.lru_cache(maxsize=1)
+def detect_env() -> EnvInfo:
+    """Probe node, claude and the API key (once per test process)."""
+    # PATH lookup first: --version only runs for a binary that exists
+    node_path = shutil.which("node")
+    return EnvInfo(
+        node_path=node_path,
+        node_version=_version(node_path),
+        # Only existence matters for claude, so skip running it
+        claude_path=shutil.which("claude"),
+        api_key=os.getenv("ANTHROPIC_API_KEY")
+    )
+
+
+@pytest.fixture(scope="session")
+def env_check() -> EnvInfo:
+    """Session-wide view of detect_env()."""
+    return detect_env()
+
+
+def pytest_runtest_setup(item):
+    """Skip claude_env tests when the Claude SDK cannot be reached."""
+    if item.get_closest_marker("claude_env") is None:
+        return
+    env = detect_env()
+    if not env.claude_path or not env.api_key:
+        pytest.skip("Claude env not available (needs claude CLI and ANTHROPIC_API_KEY)")
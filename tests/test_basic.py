@@ -3,6 +3,8 @@ Basic smoke tests for Claude + Kodosumi HITL Template.
 
 These tests verify that the basic structure is intact and imports work correctly.
 """
+import json
+
 import pytest
 
 
@@ -44,3 +46,175 @@ def test_package_metadata():
     """Test that package is properly installed."""
     import claude_hitl_template
     assert claude_hitl_template.__name__ == 'claude_hitl_template'
+
+
+class RecordingTracer:
+    """Minimal tracer double that records markdown calls."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def markdown(self, text):
+        self.sent.append(text)
+
+
+def test_format_lock_messages():
+    """Test that lock markdown renders known message types and the completion hint."""
+    from claude_hitl_template.query import _format_lock_messages
+
+    messages = [
+        {"type": "text", "content": "Here is the plan"},
+        {"type": "tool", "content": "Read"},
+        {"type": "unknown", "content": "hidden"},
+    ]
+    ready = _format_lock_messages(messages, "ready")
+    assert ready.startswith("## Claude's Response")
+    assert "Here is the plan" in ready
+    assert "🔧 *Read*" in ready
+    assert "hidden" not in ready
+    assert "Claude has finished responding" not in ready
+    assert "Continue the conversation" in ready
+
+    complete = _format_lock_messages(messages, "complete")
+    assert "Claude has finished responding" in complete
+
+
+def test_format_context_messages():
+    """Test that context messages render by type and unknown types are skipped."""
+    from claude_hitl_template.query import _format_context_messages
+
+    markdown = _format_context_messages([
+        {"type": "thinking", "content": "pondering"},
+        {"type": "tool_use", "name": "Bash", "input": {"command": "ls"}},
+        {"type": "tool_result", "content": "ok", "is_error": True},
+        {"type": "system", "subtype": "init", "data": {}},
+        {"type": "elided", "count": 3},
+        {"type": "text", "content": "user-facing"},
+    ])
+    assert "pondering" in markdown
+    assert "Using tool: Bash" in markdown
+    assert "Tool result (Error)" in markdown
+    assert "System (init)" in markdown
+    assert "3 messages elided" in markdown
+    assert "user-facing" not in markdown
+
+    assert _format_context_messages([]) == ""
+
+
+def test_preview_truncation():
+    """Test that previews are cut to the limit and marked with '...'."""
+    from claude_hitl_template.query import _preview, _truncate
+
+    assert _truncate("short", 10) == "short"
+    assert _truncate("x" * 20, 10) == "x" * 10 + "..."
+
+    assert _preview("x" * 1000, 10) == "x" * 1000
+    assert len(_preview(b"x" * 1000, 10)) > 10
+    assert len(_preview(b"x" * 1000, 10)) < 1000
+
+    big = {f"key{i}": "v" * 50 for i in range(100)}
+    partial = _preview(big, 10)
+    assert 10 < len(partial) < len(json.dumps(big))
+
+
+def test_json_preview():
+    """Test that JSON previews keep small values whole and mark cut ones."""
+    from claude_hitl_template.query import _json_preview
+
+    small = {"command": "ls", "cwd": "/tmp"}
+    assert json.loads(_json_preview(small, 200)) == small
+
+    big = {"content": "x" * 1000}
+    preview = _json_preview(big, 200)
+    assert len(preview) == 203
+    assert preview.endswith("...")
+
+
+async def test_tracer_batcher_flushes_at_max_batch():
+    """Test that the batcher sends one joined block once max_batch is reached."""
+    from claude_hitl_template.tracing import TracerBatcher
+
+    tracer = RecordingTracer()
+    batcher = TracerBatcher(tracer, max_batch=3, batch_interval_ms=60_000)
+    await batcher.markdown("one")
+    await batcher.markdown("")
+    await batcher.markdown("two")
+    assert tracer.sent == []
+
+    await batcher.markdown("three")
+    assert tracer.sent == ["one\n\ntwo\n\nthree"]
+
+
+async def test_tracer_batcher_min_flush_chars():
+    """Test that stale batches wait for min_flush_chars unless flushed explicitly."""
+    from claude_hitl_template.tracing import TracerBatcher
+
+    tracer = RecordingTracer()
+    async with TracerBatcher(tracer, batch_interval_ms=0, min_flush_chars=10) as batcher:
+        await batcher.markdown("tiny")
+        assert tracer.sent == []
+
+        await batcher.markdown("long enough")
+        assert tracer.sent == ["tiny\n\nlong enough"]
+
+        await batcher.markdown("tail")
+    assert tracer.sent == ["tiny\n\nlong enough", "tail"]
+
+
+def test_dedupe_destinations():
+    """Test that one file per /out name is kept, independent of input order."""
+    from claude_hitl_template.files import _dedupe_destinations, _destination_rank
+
+    paths = ["/w/b/x.pdf", "/w/a/x.pdf", "/w/x.pdf", "/w/y.pdf"]
+    assert _dedupe_destinations(paths) == ["/w/x.pdf", "/w/y.pdf"]
+    assert sorted(_dedupe_destinations(paths[::-1])) == ["/w/x.pdf", "/w/y.pdf"]
+
+    assert _destination_rank("/w/a/x.pdf") < _destination_rank("/w/b/x.pdf")
+    assert _dedupe_destinations(["/w/b/x.pdf", "/w/a/x.pdf"]) == ["/w/a/x.pdf"]
+
+
+def test_offload_large_payload_keeps_small_and_structured():
+    """Test that small strings and structured payloads stay inline."""
+    from claude_hitl_template.agent import LARGE_PAYLOAD_BYTES, offload_large_payload
+
+    message = {"type": "tool_result", "content": "ok"}
+    assert offload_large_payload(message, "content") == {"type": "tool_result", "content": "ok"}
+
+    structured = {"type": "tool_use", "input": {"data": "x" * (LARGE_PAYLOAD_BYTES + 1)}}
+    offload_large_payload(structured, "input")
+    assert "input_ref" not in structured
+    assert len(structured["input"]["data"]) == LARGE_PAYLOAD_BYTES + 1
+
+
+async def test_stream_turn_elides_between_head_and_tail():
+    """Test that a verbose turn shows head and tail and counts the elided middle."""
+    from claude_hitl_template.query import (
+        CONTEXT_HEAD_MESSAGES,
+        CONTEXT_TAIL_MESSAGES,
+        _stream_turn,
+    )
+
+    elided = 7
+    total = CONTEXT_HEAD_MESSAGES + CONTEXT_TAIL_MESSAGES + elided
+
+    async def resolved(record):
+        return record
+
+    async def refs():
+        yield resolved({"type": "text", "content": "hello"})
+        for i in range(total):
+            yield resolved({"type": "thinking", "content": f"<{i}>"})
+        yield resolved({"status": "complete", "completion_type": "marker"})
+
+    tracer = RecordingTracer()
+    result = await _stream_turn(tracer, refs())
+    output = "\n".join(tracer.sent)
+
+    assert result["status"] == "complete"
+    assert result["user_messages"] == [{"type": "text", "content": "hello"}]
+    assert f"{elided} messages elided" in output
+    shown = [i for i in range(total) if f"<{i}>" in output]
+    assert shown == (
+        list(range(CONTEXT_HEAD_MESSAGES))
+        + list(range(total - CONTEXT_TAIL_MESSAGES, total))
+    )